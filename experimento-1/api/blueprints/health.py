@@ -1,4 +1,7 @@
 from flask import Blueprint, jsonify
+import redis
+from rabbitmq.producer import get_producer
+from utils.read_model import get_read_model
 
 health_bp = Blueprint("health", __name__)
 
@@ -7,3 +10,18 @@ health_bp = Blueprint("health", __name__)
 def health():
     """Health check endpoint."""
     return jsonify({"status": "ok", "service": "travelhub-api"}), 200
+
+
+@health_bp.route("/health/events", methods=["GET"])
+def events_health():
+    """Backlog and confirm latency of this worker's async event publisher."""
+    return jsonify({"publisher": get_producer().async_stats()}), 200
+
+
+@health_bp.route("/health/read-model", methods=["GET"])
+def read_model_health():
+    """Whether the Valkey items read model is bootstrapped, and its size."""
+    try:
+        return jsonify(get_read_model().snapshot()), 200
+    except redis.RedisError as e:
+        return jsonify({"ready": False, "error": str(e)}), 503
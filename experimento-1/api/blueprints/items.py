@@ -1,8 +1,20 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from sqlalchemy import text
 from utils.db import get_engine
-from rabbitmq.producer import ItemProducer
+from utils.read_model import get_read_model
+from rabbitmq.producer import get_producer
+from config import (
+    RABBITMQ_PUBLISH_ASYNC,
+    ITEMS_READ_MODEL_ENABLED,
+    ITEMS_PAGE_DEFAULT_LIMIT,
+    ITEMS_PAGE_MAX_LIMIT,
+    ITEMS_STREAM_BATCH_SIZE,
+    ITEMS_BULK_MAX_ITEMS,
+    ITEMS_BULK_CHUNK_SIZE,
+)
+import json
 import logging
+import redis
 
 logger = logging.getLogger(__name__)
 items_bp = Blueprint("items", __name__)
@@ -26,30 +38,240 @@ def create_item():
         )
         new_id = result.scalar_one()
 
-    # Publicar evento a RabbitMQ (productor)
-    producer = ItemProducer()
-    if producer.connect():
-        producer.publish("item_created", {"id": new_id, "name": name})
-        producer.close()
+    # Publicar evento a RabbitMQ (productor compartido por el worker, conexión persistente).
+    # En modo async solo se encola: la confirmación del broker llega en background.
+    producer = get_producer()
+    event = {"id": new_id, "name": name}
+    if RABBITMQ_PUBLISH_ASYNC:
+        published = producer.publish_async("item_created", event)
+    else:
+        published = producer.publish("item_created", event)
+
+    if published:
         logger.info(f"[PRODUCER] Evento 'item_created' publicado: id={new_id}, name={name}")
     else:
-        logger.warning(f"[PRODUCER] Advertencia: No se pudo conectar a RabbitMQ")
+        logger.warning(f"[PRODUCER] Advertencia: No se pudo publicar en RabbitMQ")
+        read_model_call("mark_stale")
 
     return jsonify({"id": new_id, "name": name}), 201
 
 
+NDJSON_MIMETYPES = ("application/x-ndjson", "application/ndjson")
+
+
+def validate_item(raw):
+    """The item name, or ValueError with the reason it is rejected."""
+    if not isinstance(raw, dict):
+        raise ValueError("item must be a JSON object")
+    name = raw.get("name")
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError("'name' is required")
+    return name
+
+
+def iter_ndjson(stream):
+    """Yield one parsed object (or the ValueError) per non-empty line, as the body arrives."""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"invalid JSON: {e}")
+
+
+def insert_chunk(names):
+    """
+    One multi-row INSERT in its own transaction; returns the ids in input order.
+
+    Each row carries its position (`ord`) and gets its id from the sequence in
+    the `numbered` CTE (evaluated once), so ids are matched to inputs by
+    position, not by the order RETURNING happens to use.
+    """
+    params = {f"name{i}": name for i, name in enumerate(names)}
+    values = ", ".join(f"(CAST(:name{i} AS TEXT), {i})" for i in range(len(names)))
+    with engine.begin() as conn:
+        rows = conn.execute(
+            text(
+                f"WITH input (name, ord) AS (VALUES {values}), "
+                "numbered AS (SELECT nextval(pg_get_serial_sequence('items', 'id')) AS id, name, ord FROM input), "
+                "inserted AS (INSERT INTO items (id, name) SELECT id, name FROM numbered RETURNING id) "
+                "SELECT numbered.id, numbered.ord FROM numbered JOIN inserted USING (id)"
+            ),
+            params,
+        ).all()
+    ids = [None] * len(names)
+    for row in rows:
+        ids[row.ord] = row.id
+    return ids
+
+
+def publish_created(items):
+    """Publish one item_created event per item, as a single batch; returns how many went out."""
+    producer = get_producer()
+    if RABBITMQ_PUBLISH_ASYNC:
+        return producer.publish_async_many("item_created", items)
+    return producer.publish_many("item_created", items)
+
+
+def read_model_call(method, *args):
+    """Query the Valkey read model; None (-> use the DB) if disabled, not ready or unreachable."""
+    if not ITEMS_READ_MODEL_ENABLED:
+        return None
+    try:
+        return getattr(get_read_model(), method)(*args)
+    except redis.RedisError as e:
+        logger.warning(f"[READ MODEL] Valkey no disponible, leyendo de la base: {e}")
+        return None
+
+
+def stream_items(after_id, limit):
+    """JSON array written row by row from a server-side cursor (constant memory)."""
+    query = "SELECT id, name FROM items WHERE id > :after_id ORDER BY id"
+    params = {"after_id": after_id}
+    if limit is not None:
+        query += " LIMIT :limit"
+        params["limit"] = limit
+
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=ITEMS_STREAM_BATCH_SIZE).execute(text(query), params)
+        yield "["
+        separator = ""
+        for r in result:
+            yield separator + json.dumps({"id": r.id, "name": r.name})
+            separator = ","
+        yield "]"
+
+
+@items_bp.route("/items:bulk", methods=["POST"])
+def create_items_bulk():
+    """
+    Create many items from a JSON array or an NDJSON body (one item per line).
+
+    More than ITEMS_BULK_MAX_ITEMS items (array or NDJSON lines) is a 413 and
+    nothing is inserted. Otherwise valid items are inserted in chunks of
+    ITEMS_BULK_CHUNK_SIZE (multi-row INSERT, one transaction per chunk) and
+    their events are published per chunk. Invalid items are reported by index
+    in `errors` and skipped; the rest of the batch goes on. A failed publish
+    never undoes the inserts: the created ids are returned with an
+    `event_error` (so the client does not retry and duplicate them). 201 if
+    everything was created and published, 207 otherwise.
+    """
+    too_many = jsonify({"error": f"at most {ITEMS_BULK_MAX_ITEMS} items per request"}), 413
+    if request.mimetype in NDJSON_MIMETYPES:
+        # Read (at most MAX + 1 lines) before inserting anything, same contract as the array
+        payload = []
+        for raw in iter_ndjson(request.stream):
+            if len(payload) >= ITEMS_BULK_MAX_ITEMS:
+                return too_many
+            payload.append(raw)
+    else:
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, list):
+            return jsonify({"error": "body must be a JSON array of items (or NDJSON)"}), 400
+        if len(payload) > ITEMS_BULK_MAX_ITEMS:
+            return too_many
+
+    with engine.begin() as conn:
+        conn.execute(
+            text("CREATE TABLE IF NOT EXISTS items (id SERIAL PRIMARY KEY, name TEXT)")
+        )
+
+    created, errors = [], []
+    published = 0
+    chunk = []  # (index, name)
+
+    def flush():
+        nonlocal published
+        try:
+            ids = insert_chunk([name for _, name in chunk])
+        except Exception as e:
+            logger.error(f"[BULK] Falló el insert de {len(chunk)} items: {e}")
+            errors.extend({"index": index, "error": "insert failed"} for index, _ in chunk)
+        else:
+            items = [{"id": new_id, "name": name} for new_id, (_, name) in zip(ids, chunk)]
+            created.extend({"index": index, **item} for (index, _), item in zip(chunk, items))
+            try:
+                published += publish_created(items)
+            except Exception as e:
+                # The chunk is already committed: report it, do not turn the request into a 500
+                logger.error(f"[PRODUCER] Falló la publicación de {len(items)} eventos 'item_created': {e}")
+        chunk.clear()
+
+    for index, raw in enumerate(payload):
+        try:
+            if isinstance(raw, ValueError):
+                raise raw
+            chunk.append((index, validate_item(raw)))
+        except ValueError as e:
+            errors.append({"index": index, "error": str(e)})
+            continue
+        if len(chunk) >= ITEMS_BULK_CHUNK_SIZE:
+            flush()
+    if chunk:
+        flush()
+
+    body = {"created": created, "errors": errors, "published": published}
+    unpublished = len(created) - published
+    if unpublished:
+        logger.warning(f"[PRODUCER] Advertencia: {unpublished} eventos 'item_created' sin publicar")
+        read_model_call("mark_stale")
+        body["event_error"] = f"{unpublished} item_created events could not be published"
+    logger.info(f"[PRODUCER] Bulk: {len(created)} items creados, {published} eventos publicados, {len(errors)} errores")
+
+    status = 201 if not errors and not unpublished else 207
+    return jsonify(body), status
+
+
 @items_bp.route("/items", methods=["GET"])
 def list_items():
-    """List all items."""
-    with engine.connect() as conn:
-        rows = conn.execute(text("SELECT id, name FROM items ORDER BY id")).all()
-        items = [{"id": r.id, "name": r.name} for r in rows]
-    return jsonify(items), 200
+    """
+    List items by keyset pagination: ?after_id=<last id seen>&limit=<n> (capped).
+
+    The next page is advertised in `Link: <?after_id=..&limit=..>; rel="next"`
+    and `X-Next-After-Id`, and is absent on the last page. With ?stream=true the
+    whole range is streamed from the database instead (limit optional, no cap).
+    """
+    try:
+        after_id = int(request.args.get("after_id", 0))
+        limit = request.args.get("limit")
+        limit = int(limit) if limit is not None else None
+    except ValueError:
+        return jsonify({"error": "'after_id' and 'limit' must be integers"}), 400
+    if limit is not None and limit < 1:
+        return jsonify({"error": "'limit' must be positive"}), 400
+
+    if request.args.get("stream", "false").lower() == "true":
+        return Response(stream_items(after_id, limit), mimetype="application/json")
+
+    limit = min(limit or ITEMS_PAGE_DEFAULT_LIMIT, ITEMS_PAGE_MAX_LIMIT)
+    # One extra row tells whether there is a next page
+    items = read_model_call("list", after_id, limit + 1)
+    if items is None:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text("SELECT id, name FROM items WHERE id > :after_id ORDER BY id LIMIT :limit"),
+                {"after_id": after_id, "limit": limit + 1},
+            ).all()
+            items = [{"id": r.id, "name": r.name} for r in rows]
+
+    response = jsonify(items[:limit])
+    if len(items) > limit:
+        next_after_id = items[limit - 1]["id"]
+        response.headers["X-Next-After-Id"] = str(next_after_id)
+        response.headers["Link"] = f'<?after_id={next_after_id}&limit={limit}>; rel="next"'
+    return response, 200
 
 
 @items_bp.route("/items/<int:item_id>", methods=["GET"])
 def get_item(item_id):
-    """Get a specific item by ID."""
+    """Get a specific item by ID (read model first, database fallback)."""
+    item = read_model_call("get", item_id)
+    if item is not None:
+        return jsonify(item), 200
+
+    # Not projected yet (the event may still be in flight): the database has the final word
     with engine.connect() as conn:
         row = conn.execute(
             text("SELECT id, name FROM items WHERE id = :id"), {"id": item_id}
@@ -19,6 +19,47 @@ RABBITMQ_PASS = os.getenv("RABBITMQ_PASS", "guest")
 
 RABBITMQ_URL = f"amqp://{RABBITMQ_USER}:{RABBITMQ_PASS}@{RABBITMQ_HOST}:{RABBITMQ_PORT}/"
 
+# Publisher: long-lived connections/channels per worker process
+RABBITMQ_PUBLISHER_POOL_SIZE = int(os.getenv("RABBITMQ_PUBLISHER_POOL_SIZE", "2"))
+RABBITMQ_PUBLISHER_ACQUIRE_TIMEOUT_SEC = float(os.getenv("RABBITMQ_PUBLISHER_ACQUIRE_TIMEOUT_SEC", "2"))
+
+# Async publishing: bounded buffer drained by a background thread with publisher confirms
+RABBITMQ_PUBLISH_ASYNC = os.getenv("RABBITMQ_PUBLISH_ASYNC", "true").lower() == "true"
+RABBITMQ_PUBLISH_BUFFER = int(os.getenv("RABBITMQ_PUBLISH_BUFFER", "10000"))
+RABBITMQ_PUBLISH_MAX_IN_FLIGHT = int(os.getenv("RABBITMQ_PUBLISH_MAX_IN_FLIGHT", "256"))
+RABBITMQ_PUBLISH_MAX_RETRIES = int(os.getenv("RABBITMQ_PUBLISH_MAX_RETRIES", "5"))
+RABBITMQ_PUBLISH_RECONNECT_SEC = float(os.getenv("RABBITMQ_PUBLISH_RECONNECT_SEC", "1"))
+RABBITMQ_PUBLISH_DRAIN_TIMEOUT_SEC = float(os.getenv("RABBITMQ_PUBLISH_DRAIN_TIMEOUT_SEC", "5"))
+
+# Consumer: prefetch window, handler worker pool (thread | process) and batched acks
+CONSUMER_PREFETCH = int(os.getenv("CONSUMER_PREFETCH", "64"))
+CONSUMER_WORKERS = int(os.getenv("CONSUMER_WORKERS", str(os.cpu_count() or 1)))
+CONSUMER_POOL = os.getenv("CONSUMER_POOL", "thread")
+CONSUMER_ACK_BATCH = int(os.getenv("CONSUMER_ACK_BATCH", "16"))
+CONSUMER_ACK_INTERVAL_SEC = float(os.getenv("CONSUMER_ACK_INTERVAL_SEC", "0.2"))
+
+# Failed events: delayed retries (TTL + dead-letter back to the main queue), then a dead-letter queue
+CONSUMER_MAX_ATTEMPTS = int(os.getenv("CONSUMER_MAX_ATTEMPTS", "5"))
+CONSUMER_RETRY_BASE_DELAY_MS = int(os.getenv("CONSUMER_RETRY_BASE_DELAY_MS", "1000"))
+CONSUMER_RETRY_MAX_DELAY_MS = int(os.getenv("CONSUMER_RETRY_MAX_DELAY_MS", "60000"))
+
+# Items read model in Valkey: kept by the event-consumer, read by GET /items (DB fallback)
+ITEMS_READ_MODEL_ENABLED = os.getenv("ITEMS_READ_MODEL_ENABLED", "true").lower() == "true"
+ITEMS_READ_MODEL_PREFIX = os.getenv("ITEMS_READ_MODEL_PREFIX", "items:rm")
+VALKEY_HOST = os.getenv("VALKEY_HOST", "valkey")
+VALKEY_PORT = int(os.getenv("VALKEY_PORT", "6379"))
+VALKEY_TIMEOUT_SEC = float(os.getenv("VALKEY_TIMEOUT_SEC", "0.2"))
+ITEMS_READ_MODEL_RECONCILE_SEC = float(os.getenv("ITEMS_READ_MODEL_RECONCILE_SEC", "30"))
+
+# GET /items: keyset pages (?after_id=&limit=, capped) and streamed mode (?stream=true, server-side cursor)
+ITEMS_PAGE_DEFAULT_LIMIT = int(os.getenv("ITEMS_PAGE_DEFAULT_LIMIT", "100"))
+ITEMS_PAGE_MAX_LIMIT = int(os.getenv("ITEMS_PAGE_MAX_LIMIT", "1000"))
+ITEMS_STREAM_BATCH_SIZE = int(os.getenv("ITEMS_STREAM_BATCH_SIZE", "500"))
+
+# POST /items:bulk: items per request and rows per multi-row INSERT (one transaction + one event batch each)
+ITEMS_BULK_MAX_ITEMS = int(os.getenv("ITEMS_BULK_MAX_ITEMS", "10000"))
+ITEMS_BULK_CHUNK_SIZE = int(os.getenv("ITEMS_BULK_CHUNK_SIZE", "500"))
+
 # Flask config
 FLASK_ENV = os.getenv("FLASK_ENV", "production")
 DEBUG = FLASK_ENV == "development"
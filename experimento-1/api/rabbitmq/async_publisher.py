@@ -0,0 +1,287 @@
+"""
+Asynchronous event publisher with publisher confirms.
+
+HTTP handlers only append the serialized event to a bounded in-process
+buffer. A background thread owns a pika SelectConnection (confirm mode)
+and publishes whatever is buffered back-to-back, keeping up to
+`max_in_flight` messages unconfirmed; the broker acks them in batches
+(`multiple=True`). Nacked messages, and messages still unconfirmed when
+the connection drops, are put back at the head of the buffer and retried
+up to `max_retries` times; `on_failed` (if given) is called from the
+ioloop thread for each event dropped after that. stop() flushes with a
+bounded wait and calls `on_failed` for every event still buffered or
+unconfirmed when it gives up (an unconfirmed one may have reached the
+broker, but it cannot be told apart from a lost one).
+"""
+import collections
+import logging
+import threading
+import time
+
+import pika
+
+logger = logging.getLogger(__name__)
+
+
+class _Pending:
+    __slots__ = ("body", "attempts", "enqueued_at", "published_at")
+
+    def __init__(self, body):
+        self.body = body
+        self.attempts = 0
+        self.enqueued_at = time.monotonic()
+        self.published_at = None
+
+
+class AsyncEventPublisher:
+    """Buffered, confirm-mode publisher running its own pika ioloop thread."""
+
+    def __init__(self, url, queue_name, max_buffer, max_in_flight, max_retries, reconnect_delay_sec,
+                 on_failed=None):
+        self.parameters = pika.URLParameters(url)
+        self.queue_name = queue_name
+        self.max_buffer = max_buffer
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.reconnect_delay_sec = reconnect_delay_sec
+        self.on_failed = on_failed
+
+        self._lock = threading.Lock()
+        self._buffer = collections.deque()
+        self._wakeup_pending = False
+
+        # Only touched from the ioloop thread
+        self._connection = None
+        self._channel = None
+        self._ready = False
+        self._delivery_tag = 0
+        self._unconfirmed = collections.OrderedDict()
+
+        self._stopping = False
+        self.stats = {
+            "enqueued": 0,
+            "rejected_full": 0,
+            "published": 0,
+            "confirmed": 0,
+            "nacked": 0,
+            "retried": 0,
+            "failed": 0,
+            "reconnects": 0,
+        }
+        self._latency_count = 0
+        self._latency_sum = 0.0
+        self._latency_max = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="event-publisher", daemon=True)
+        self._thread.start()
+
+    # ---- caller side (any thread) ----
+
+    def publish(self, body):
+        """Buffer one event; False if the buffer is full (caller decides what to do)."""
+        return self.publish_many([body]) == 1
+
+    def publish_many(self, bodies):
+        """Buffer events under one lock and one wakeup; returns how many fit in the buffer."""
+        with self._lock:
+            # After stop() nothing would publish them: reject, so the caller treats them as lost
+            free = 0 if self._stopping else max(0, self.max_buffer - len(self._buffer))
+            accepted = bodies[:free]
+            self._buffer.extend(_Pending(body) for body in accepted)
+            self.stats["enqueued"] += len(accepted)
+            self.stats["rejected_full"] += len(bodies) - len(accepted)
+            wake = bool(accepted) and not self._wakeup_pending
+            if accepted:
+                self._wakeup_pending = True
+
+        if wake:
+            self._wake()
+        return len(accepted)
+
+    def _wake(self):
+        connection = self._connection
+        if connection is None:
+            return
+        try:
+            connection.ioloop.add_callback_threadsafe(self._drain)
+        except Exception:
+            # Connection being replaced: the next channel open drains the buffer anyway
+            pass
+
+    def backlog(self):
+        with self._lock:
+            return len(self._buffer) + len(self._unconfirmed)
+
+    def stop(self, timeout_sec):
+        """
+        Wait (bounded) for the backlog to be confirmed, then close the connection;
+        whatever is left is reported through `on_failed`.
+        """
+        deadline = time.monotonic() + timeout_sec
+        while self.backlog() and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        with self._lock:
+            self._stopping = True
+        connection = self._connection
+        if connection is not None:
+            try:
+                connection.ioloop.add_callback_threadsafe(self._close)
+            except Exception:
+                pass
+        self._thread.join(timeout=max(0.0, deadline - time.monotonic()) + 1)
+
+        # Closing requeues the unconfirmed ones into the buffer; if the ioloop did not
+        # get to close in time they are still in _unconfirmed
+        with self._lock:
+            leftover = list(self._buffer)
+            self._buffer.clear()
+        leftover.extend(self._unconfirmed.values())
+        self._unconfirmed.clear()
+        if leftover:
+            logger.error(f"[PUBLISHER] stopping with {len(leftover)} events not confirmed")
+        for message in leftover:
+            self._give_up(message)
+
+    def snapshot(self):
+        with self._lock:
+            buffered = len(self._buffer)
+        avg = self._latency_sum / self._latency_count if self._latency_count else None
+        return {
+            **self.stats,
+            "connected": self._ready,
+            "buffered": buffered,
+            "in_flight": len(self._unconfirmed),
+            "max_buffer": self.max_buffer,
+            "max_in_flight": self.max_in_flight,
+            "confirm_latency_ms_avg": round(avg * 1000, 3) if avg is not None else None,
+            "confirm_latency_ms_max": round(self._latency_max * 1000, 3),
+        }
+
+    # ---- ioloop thread ----
+
+    def _run(self):
+        while not self._stopping:
+            self._connection = pika.SelectConnection(
+                self.parameters,
+                on_open_callback=self._on_connection_open,
+                on_open_error_callback=self._on_connection_open_error,
+                on_close_callback=self._on_connection_closed,
+            )
+            self._connection.ioloop.start()
+            if not self._stopping:
+                self.stats["reconnects"] += 1
+                time.sleep(self.reconnect_delay_sec)
+
+    def _close(self):
+        if self._connection is not None and self._connection.is_open:
+            self._connection.close()
+        elif self._connection is not None:
+            self._connection.ioloop.stop()
+
+    def _on_connection_open(self, connection):
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_open_error(self, connection, error):
+        logger.warning(f"[PUBLISHER] RabbitMQ connection failed: {error}")
+        connection.ioloop.stop()
+
+    def _on_connection_closed(self, connection, reason):
+        self._ready = False
+        self._channel = None
+        self._requeue_unconfirmed()
+        if not self._stopping:
+            logger.warning(f"[PUBLISHER] RabbitMQ connection closed, reconnecting: {reason}")
+        connection.ioloop.stop()
+
+    def _on_channel_open(self, channel):
+        self._channel = channel
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.confirm_delivery(ack_nack_callback=self._on_confirm)
+        channel.queue_declare(queue=self.queue_name, durable=True, callback=self._on_queue_declared)
+
+    def _on_channel_closed(self, channel, reason):
+        self._ready = False
+        if self._connection is not None and self._connection.is_open:
+            self._connection.close()
+
+    def _on_queue_declared(self, _frame):
+        self._delivery_tag = 0
+        self._ready = True
+        self._drain()
+
+    def _requeue_unconfirmed(self):
+        pending = list(self._unconfirmed.values())
+        self._unconfirmed.clear()
+        self._retry(pending)
+
+    def _give_up(self, message):
+        self.stats["failed"] += 1
+        if self.on_failed is not None:
+            try:
+                self.on_failed(message.body)
+            except Exception as e:
+                logger.warning(f"[PUBLISHER] on_failed callback error: {e}")
+
+    def _retry(self, pending):
+        keep = []
+        for message in pending:
+            message.attempts += 1
+            if message.attempts > self.max_retries:
+                logger.error(f"[PUBLISHER] event dropped after {message.attempts} attempts")
+                self._give_up(message)
+            else:
+                self.stats["retried"] += 1
+                keep.append(message)
+        if keep:
+            with self._lock:
+                # Retries go first and are not subject to max_buffer
+                self._buffer.extendleft(reversed(keep))
+
+    def _drain(self):
+        with self._lock:
+            self._wakeup_pending = False
+        if not self._ready:
+            return
+
+        properties = pika.BasicProperties(delivery_mode=2, content_type="application/json")
+        while len(self._unconfirmed) < self.max_in_flight:
+            with self._lock:
+                if not self._buffer:
+                    return
+                message = self._buffer.popleft()
+
+            self._delivery_tag += 1
+            message.published_at = time.monotonic()
+            self._unconfirmed[self._delivery_tag] = message
+            self._channel.basic_publish(
+                exchange="",
+                routing_key=self.queue_name,
+                body=message.body,
+                properties=properties,
+            )
+            self.stats["published"] += 1
+
+    def _on_confirm(self, frame):
+        method = frame.method
+        ack = isinstance(method, pika.spec.Basic.Ack)
+
+        if method.multiple:
+            tags = [tag for tag in self._unconfirmed if tag <= method.delivery_tag]
+        else:
+            tags = [method.delivery_tag] if method.delivery_tag in self._unconfirmed else []
+
+        now = time.monotonic()
+        settled = [self._unconfirmed.pop(tag) for tag in tags]
+        if ack:
+            self.stats["confirmed"] += len(settled)
+            for message in settled:
+                latency = now - message.published_at
+                self._latency_count += 1
+                self._latency_sum += latency
+                self._latency_max = max(self._latency_max, latency)
+        else:
+            self.stats["nacked"] += len(settled)
+            self._retry(settled)
+
+        self._drain()
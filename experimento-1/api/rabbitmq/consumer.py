@@ -1,12 +1,45 @@
 """
 RabbitMQ Consumer example.
 Consumes item events from the queue (standalone service).
+
+Deliveries are handed to a worker pool (threads or processes) that runs
+the handler registered for each event_type (see handlers.py); up to
+CONSUMER_PREFETCH messages are in flight at once. Results come back to
+the connection thread, which acks the longest contiguous run of finished
+deliveries with a single `multiple=True` ack. On SIGTERM/SIGINT the
+consumer stops taking deliveries, waits for in-flight handlers, flushes
+pending acks and closes the connection.
+
+A failed event is never requeued in place. It is republished with an
+`x-attempts` header to `<queue>.retry.<delay>ms`, a queue without
+consumers whose message TTL dead-letters it back to the main queue after
+the delay (exponential per attempt). After CONSUMER_MAX_ATTEMPTS, or if
+the body cannot be parsed, it goes to `<queue>.dlq` instead.
 """
-import pika
 import json
-import time
 import logging
-from config import RABBITMQ_URL
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pika
+from config import (
+    RABBITMQ_URL,
+    CONSUMER_PREFETCH,
+    CONSUMER_WORKERS,
+    CONSUMER_POOL,
+    CONSUMER_ACK_BATCH,
+    CONSUMER_ACK_INTERVAL_SEC,
+    CONSUMER_MAX_ATTEMPTS,
+    CONSUMER_RETRY_BASE_DELAY_MS,
+    CONSUMER_RETRY_MAX_DELAY_MS,
+    ITEMS_READ_MODEL_ENABLED,
+    ITEMS_READ_MODEL_RECONCILE_SEC,
+)
+from rabbitmq.handlers import dispatch
+from utils.db import get_engine
+from utils.read_model import get_read_model
 
 # Configurar logging para salida inmediata
 logging.basicConfig(
@@ -18,11 +51,33 @@ logger = logging.getLogger(__name__)
 
 
 class ItemConsumer:
-    """Consume item events from RabbitMQ."""
+    """Consume item events from RabbitMQ with a worker pool and batched acks."""
 
-    def __init__(self, queue_name="item_events"):
+    def __init__(self, queue_name="item_events", prefetch=CONSUMER_PREFETCH, workers=CONSUMER_WORKERS,
+                 pool=CONSUMER_POOL, ack_batch=CONSUMER_ACK_BATCH, ack_interval_sec=CONSUMER_ACK_INTERVAL_SEC):
         self.queue_name = queue_name
+        self.prefetch = prefetch
+        self.workers = workers
+        self.pool = pool
+        # An ack batch as large as the prefetch window would stall deliveries
+        self.ack_batch = max(1, min(ack_batch, prefetch // 2))
+        self.ack_interval_sec = ack_interval_sec
         self.channel = None
+        self.executor = None
+
+        self.max_attempts = CONSUMER_MAX_ATTEMPTS
+        self.retry_delays_ms = [
+            min(CONSUMER_RETRY_BASE_DELAY_MS * 2 ** i, CONSUMER_RETRY_MAX_DELAY_MS)
+            for i in range(max(0, CONSUMER_MAX_ATTEMPTS - 1))
+        ]
+        self.dead_letter_queue = f"{queue_name}.dlq"
+
+        # delivery_tag -> None (running) / True (settled, ack pending); insertion = delivery order
+        self._outstanding = {}
+        self._messages = {}
+        self._done_unacked = 0
+        self._stopping = False
+        self.stats = {"processed": 0, "failed": 0, "retried": 0, "dead_lettered": 0, "acks_sent": 0}
 
     def connect(self):
         """Connect to RabbitMQ."""
@@ -34,6 +89,7 @@ class ItemConsumer:
                 )
                 self.channel = self.connection.channel()
                 self.channel.queue_declare(queue=self.queue_name, durable=True)
+                self._declare_retry_topology()
                 logger.info(f"✓ Connected to RabbitMQ, listening on queue '{self.queue_name}'")
                 return True
             except Exception as e:
@@ -44,19 +100,160 @@ class ItemConsumer:
                 time.sleep(2)
         return False
 
+    def _retry_queue(self, delay_ms):
+        return f"{self.queue_name}.retry.{delay_ms}ms"
+
+    def _declare_retry_topology(self):
+        """One delay queue per backoff step (named by delay, so changing it never clashes) + the DLQ."""
+        for delay_ms in sorted(set(self.retry_delays_ms)):
+            self.channel.queue_declare(
+                queue=self._retry_queue(delay_ms),
+                durable=True,
+                arguments={
+                    "x-message-ttl": delay_ms,
+                    "x-dead-letter-exchange": "",
+                    "x-dead-letter-routing-key": self.queue_name,
+                },
+            )
+        self.channel.queue_declare(queue=self.dead_letter_queue, durable=True)
+        # Republish + ack must not lose the event: wait for the broker confirm (failure path only)
+        self.channel.confirm_delivery()
+
+    def _retry_or_dead_letter(self, properties, body, error, poison=False):
+        """Republish a failed delivery to the next delay queue, or to the DLQ once attempts run out."""
+        headers = dict(properties.headers or {}) if properties is not None else {}
+        attempts = int(headers.get("x-attempts", 0)) + 1
+        headers["x-attempts"] = attempts
+        headers["x-last-error"] = str(error)[:500]
+
+        if attempts < self.max_attempts and not poison:
+            routing_key = self._retry_queue(self.retry_delays_ms[attempts - 1])
+            self.stats["retried"] += 1
+        else:
+            routing_key = self.dead_letter_queue
+            self.stats["dead_lettered"] += 1
+            logger.warning(
+                f"Message dead-lettered after {attempts} attempt(s): {error} "
+                f"(dead_lettered={self.stats['dead_lettered']})"
+            )
+
+        self.channel.basic_publish(
+            exchange="",
+            routing_key=routing_key,
+            body=body,
+            properties=pika.BasicProperties(
+                delivery_mode=2,
+                content_type=getattr(properties, "content_type", None),
+                headers=headers,
+            ),
+        )
+
     def on_message(self, ch, method, properties, body):
-        """Handle incoming messages."""
+        """Hand the delivery to the worker pool; the ack happens when it finishes."""
+        tag = method.delivery_tag
         try:
             message = json.loads(body)
             event_type = message.get('event_type', 'unknown')
             data = message.get('data', {})
-            logger.info(f"[EVENT CONSUMED] Type: {event_type} | Data: {data}")
-            # TODO: Process the event (e.g., update cache, log, send notification)
-            ch.basic_ack(delivery_tag=method.delivery_tag)
-            logger.debug(f"Message acknowledged (delivery_tag: {method.delivery_tag})")
         except Exception as e:
+            # Poison message: straight to the DLQ, retrying cannot fix a body that does not parse
             logger.error(f"Error processing message: {e}")
-            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+            self.stats["failed"] += 1
+            self._retry_or_dead_letter(properties, body, e, poison=True)
+            self._outstanding[tag] = True
+            self._done_unacked += 1
+            return
+
+        self._outstanding[tag] = None
+        self._messages[tag] = (properties, body)
+        future = self.executor.submit(dispatch, event_type, data)
+        future.add_done_callback(
+            lambda f: self.connection.add_callback_threadsafe(lambda: self._on_done(tag, f))
+        )
+
+    def _on_done(self, tag, future):
+        """Connection thread: record the handler result and ack what is contiguous."""
+        error = future.exception()
+        properties, body = self._messages.pop(tag)
+        if error is None:
+            self.stats["processed"] += 1
+        else:
+            logger.error(f"Error processing message: {error}")
+            self.stats["failed"] += 1
+            # The copy now lives in a retry queue / the DLQ: the original is acked like a success
+            self._retry_or_dead_letter(properties, body, error)
+
+        self._outstanding[tag] = True
+        self._done_unacked += 1
+
+        if self._done_unacked >= self.ack_batch or self._stopping:
+            self._flush_acks()
+
+    def _flush_acks(self):
+        """Ack the longest run of finished deliveries at the head with one multiple=True ack."""
+        last = None
+        for tag, done in self._outstanding.items():
+            if not done:
+                break
+            last = tag
+        if last is None:
+            return
+
+        for tag in [t for t in self._outstanding if t <= last]:
+            del self._outstanding[tag]
+        self._done_unacked = sum(1 for done in self._outstanding.values() if done)
+        self.channel.basic_ack(delivery_tag=last, multiple=True)
+        self.stats["acks_sent"] += 1
+
+    def _schedule_flush(self):
+        if self._stopping:
+            return
+        self._flush_acks()
+        self.connection.call_later(self.ack_interval_sec, self._schedule_flush)
+
+    def _request_stop(self, signum, frame):
+        logger.info("Shutting down consumer (draining in-flight events)...")
+        self._stopping = True
+        self.connection.add_callback_threadsafe(self.channel.stop_consuming)
+
+    def _drain(self):
+        """Wait for in-flight handlers, flush their acks and close the connection."""
+        while self._outstanding and any(done is None for done in self._outstanding.values()):
+            self.connection.process_data_events(time_limit=0.1)
+        self._flush_acks()
+        self.executor.shutdown(wait=True)
+        self.connection.close()
+        logger.info(
+            f"Consumer stopped: processed={self.stats['processed']} failed={self.stats['failed']} "
+            f"retried={self.stats['retried']} dead_lettered={self.stats['dead_lettered']} "
+            f"acks_sent={self.stats['acks_sent']}"
+        )
+
+    def bootstrap_read_model(self, retries=5, delay_sec=2):
+        """Load existing items into the Valkey read model before applying events."""
+        for attempt in range(1, retries + 1):
+            try:
+                count = get_read_model().reconcile(get_engine())
+                logger.info(f"✓ Items read model bootstrapped ({count} items loaded)")
+                return True
+            except Exception as e:
+                logger.warning(f"Read model bootstrap failed (retry {attempt}/{retries}): {e}")
+                time.sleep(delay_sec)
+        # Events are still applied; the API serves lists from the DB until a reconcile succeeds
+        logger.error("Read model not bootstrapped, API reads fall back to the database")
+        return False
+
+    def _reconcile_loop(self):
+        """Background thread: repair rows whose event never arrived (lost publish, DLQ)."""
+        engine = get_engine()
+        while not self._stopping:
+            time.sleep(ITEMS_READ_MODEL_RECONCILE_SEC)
+            try:
+                added = get_read_model().reconcile(engine)
+                if added:
+                    logger.warning(f"Read model reconcile added {added} missing item(s)")
+            except Exception as e:
+                logger.warning(f"Read model reconcile failed: {e}")
 
     def start(self):
         """Start consuming messages."""
@@ -64,17 +261,27 @@ class ItemConsumer:
             logger.error("Failed to connect to RabbitMQ. Exiting.")
             return
 
-        self.channel.basic_qos(prefetch_count=1)
+        if ITEMS_READ_MODEL_ENABLED:
+            self.bootstrap_read_model()
+            threading.Thread(target=self._reconcile_loop, name="read-model-reconcile", daemon=True).start()
+
+        executor_cls = ProcessPoolExecutor if self.pool == "process" else ThreadPoolExecutor
+        self.executor = executor_cls(max_workers=self.workers)
+
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        self.channel.basic_qos(prefetch_count=self.prefetch)
         self.channel.basic_consume(
             queue=self.queue_name, on_message_callback=self.on_message
         )
-        logger.info("👂 Waiting for messages...")
-        try:
-            self.channel.start_consuming()
-        except KeyboardInterrupt:
-            logger.info("Shutting down consumer...")
-            self.channel.stop_consuming()
-            self.connection.close()
+        self.connection.call_later(self.ack_interval_sec, self._schedule_flush)
+        logger.info(
+            f"👂 Waiting for messages... (prefetch={self.prefetch}, {self.pool} workers={self.workers}, "
+            f"ack_batch={self.ack_batch})"
+        )
+        self.channel.start_consuming()
+        self._drain()
 
 
 if __name__ == "__main__":
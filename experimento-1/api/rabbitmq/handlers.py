@@ -0,0 +1,46 @@
+"""
+Event handlers for the consumer, registered per event_type.
+
+Handlers are plain module-level functions taking the event `data` dict,
+so they can run in a thread or a process pool. Raising an exception
+means the event was not processed (the consumer schedules a delayed
+retry, or dead-letters it after CONSUMER_MAX_ATTEMPTS).
+"""
+import logging
+
+from config import ITEMS_READ_MODEL_ENABLED
+from utils.read_model import get_read_model
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def handles(event_type):
+    """Register the decorated function as the handler for `event_type`."""
+    def decorator(fn):
+        HANDLERS[event_type] = fn
+        return fn
+    return decorator
+
+
+def log_event(event_type, data):
+    """Fallback for event types without a specific handler."""
+    logger.info(f"[EVENT CONSUMED] Type: {event_type} | Data: {data}")
+
+
+@handles("item_created")
+def on_item_created(data):
+    logger.info(f"[EVENT CONSUMED] Type: item_created | Data: {data}")
+    if ITEMS_READ_MODEL_ENABLED:
+        # A Valkey error propagates: the consumer retries the event later
+        get_read_model().apply_created(data)
+
+
+def dispatch(event_type, data):
+    """Run the handler registered for event_type (or the logging fallback)."""
+    handler = HANDLERS.get(event_type)
+    if handler is None:
+        log_event(event_type, data)
+    else:
+        handler(data)
@@ -1,56 +1,217 @@
 """
 RabbitMQ Producer example.
 Sends messages to a queue when items are created.
+
+A single ItemProducer is shared per worker process (see get_producer): it
+keeps a small pool of open connections/channels, so publishing an event
+is one frame write instead of a full AMQP handshake per request.
+publish_async() hands the event to a background confirm-mode publisher
+instead (see async_publisher.py), so the request does not wait on RabbitMQ.
 """
-import pika
+import atexit
 import json
-from config import RABBITMQ_URL
+import logging
+import os
+import queue
+import threading
+
+import pika
+from config import (
+    RABBITMQ_URL,
+    RABBITMQ_PUBLISHER_POOL_SIZE,
+    RABBITMQ_PUBLISHER_ACQUIRE_TIMEOUT_SEC,
+    RABBITMQ_PUBLISH_BUFFER,
+    RABBITMQ_PUBLISH_MAX_IN_FLIGHT,
+    RABBITMQ_PUBLISH_MAX_RETRIES,
+    RABBITMQ_PUBLISH_RECONNECT_SEC,
+    RABBITMQ_PUBLISH_DRAIN_TIMEOUT_SEC,
+    ITEMS_READ_MODEL_ENABLED,
+)
+from rabbitmq.async_publisher import AsyncEventPublisher
+from utils.read_model import get_read_model
+
+logger = logging.getLogger(__name__)
+
+
+class _PooledChannel:
+    """One connection + channel, used by a single thread at a time."""
+
+    def __init__(self, connection, channel):
+        self.connection = connection
+        self.channel = channel
+
+    @property
+    def is_open(self):
+        return self.connection.is_open and self.channel.is_open
+
+    def close(self):
+        try:
+            if self.connection.is_open:
+                self.connection.close()
+        except Exception:
+            pass
 
 
 class ItemProducer:
-    """Publish item events to RabbitMQ."""
+    """Publish item events to RabbitMQ over a pool of long-lived channels."""
 
-    def __init__(self, queue_name="item_events"):
+    def __init__(self, queue_name="item_events", pool_size=RABBITMQ_PUBLISHER_POOL_SIZE,
+                 acquire_timeout_sec=RABBITMQ_PUBLISHER_ACQUIRE_TIMEOUT_SEC, on_async_failure=None):
         self.queue_name = queue_name
+        self.on_async_failure = on_async_failure
+        self.pool_size = pool_size
+        self.acquire_timeout_sec = acquire_timeout_sec
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._declared = False
+        self._async = None
+
+    def _open(self):
+        """Open a new connection/channel; the queue is declared only once."""
+        connection = pika.BlockingConnection(pika.URLParameters(RABBITMQ_URL))
+        channel = connection.channel()
+        if not self._declared:
+            channel.queue_declare(queue=self.queue_name, durable=True)
+            self._declared = True
+        return _PooledChannel(connection, channel)
+
+    def _acquire(self):
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if pooled.is_open:
+                return pooled
+            self._discard(pooled)
+
+        with self._lock:
+            can_open = self._opened < self.pool_size
+            if can_open:
+                self._opened += 1
+        if can_open:
+            try:
+                return self._open()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+
+        return self._idle.get(timeout=self.acquire_timeout_sec)
+
+    def _release(self, pooled):
+        self._idle.put(pooled)
+
+    def _discard(self, pooled):
+        pooled.close()
+        with self._lock:
+            self._opened -= 1
 
     def connect(self):
-        """Connect to RabbitMQ."""
+        """Make sure at least one channel can be opened (lazy otherwise)."""
         try:
-            self.connection = pika.BlockingConnection(
-                pika.URLParameters(RABBITMQ_URL)
-            )
-            self.channel = self.connection.channel()
-            self.channel.queue_declare(queue=self.queue_name, durable=True)
+            self._release(self._acquire())
         except Exception as e:
-            import logging
-            logging.error(f"Error connecting to RabbitMQ: {e}")
+            logger.error(f"Error connecting to RabbitMQ: {e}")
             return False
         return True
 
     def publish(self, event_type, data):
-        """Publish an event to the queue."""
-        if not hasattr(self, "channel"):
-            if not self.connect():
-                return False
-
-        message = {
-            "event_type": event_type,
-            "data": data,
-        }
-        try:
-            self.channel.basic_publish(
-                exchange="",
-                routing_key=self.queue_name,
-                body=json.dumps(message),
-                properties=pika.BasicProperties(delivery_mode=2),  # persistent
-            )
-            return True
-        except Exception as e:
-            import logging
-            logging.error(f"Error publishing message: {e}")
-            return False
+        """Publish an event to the queue; reconnects once on a stale channel."""
+        return self.publish_many(event_type, [data]) == 1
+
+    def publish_many(self, event_type, data_list):
+        """Publish one event per item over a single pooled channel; returns how many were sent."""
+        bodies = [json.dumps({"event_type": event_type, "data": data}) for data in data_list]
+        sent = 0
+
+        for attempt in (1, 2):
+            try:
+                pooled = self._acquire()
+            except Exception as e:
+                logger.error(f"Error connecting to RabbitMQ: {e}")
+                return sent
+
+            try:
+                for body in bodies[sent:]:
+                    pooled.channel.basic_publish(
+                        exchange="",
+                        routing_key=self.queue_name,
+                        body=body,
+                        properties=pika.BasicProperties(delivery_mode=2),  # persistent
+                    )
+                    sent += 1
+            except Exception as e:
+                # Broker restart / idle connection dropped: drop it and resume on a fresh one
+                self._discard(pooled)
+                if attempt == 2:
+                    logger.error(f"Error publishing message: {e}")
+                    return sent
+                continue
+
+            self._release(pooled)
+            return sent
+        return sent
+
+    def _async_publisher(self):
+        """The background confirm-mode publisher, started on first use."""
+        if self._async is None:
+            with self._lock:
+                if self._async is None:
+                    self._async = AsyncEventPublisher(
+                        RABBITMQ_URL,
+                        self.queue_name,
+                        max_buffer=RABBITMQ_PUBLISH_BUFFER,
+                        max_in_flight=RABBITMQ_PUBLISH_MAX_IN_FLIGHT,
+                        max_retries=RABBITMQ_PUBLISH_MAX_RETRIES,
+                        reconnect_delay_sec=RABBITMQ_PUBLISH_RECONNECT_SEC,
+                        on_failed=self.on_async_failure,
+                    )
+        return self._async
+
+    def publish_async(self, event_type, data):
+        """Buffer an event for the background confirm-mode publisher."""
+        return self._async_publisher().publish(json.dumps({"event_type": event_type, "data": data}))
+
+    def publish_async_many(self, event_type, data_list):
+        """Buffer one event per item in a single call; returns how many were accepted."""
+        bodies = [json.dumps({"event_type": event_type, "data": data}) for data in data_list]
+        return self._async_publisher().publish_many(bodies)
+
+    def async_stats(self):
+        """Backlog / confirm metrics of the background publisher (None if unused)."""
+        return self._async.snapshot() if self._async is not None else None
 
     def close(self):
-        """Close the connection."""
-        if hasattr(self, "connection"):
-            self.connection.close()
+        """Flush the async backlog (bounded) and close every pooled connection."""
+        if self._async is not None:
+            self._async.stop(RABBITMQ_PUBLISH_DRAIN_TIMEOUT_SEC)
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+
+def _event_lost(body):
+    """An item event was dropped after max retries: the read model can no longer be trusted."""
+    get_read_model().mark_stale()
+
+
+_producer = None
+_producer_pid = None
+_producer_lock = threading.Lock()
+
+
+def get_producer():
+    """Process-wide ItemProducer (re-created after a fork, e.g. gunicorn workers)."""
+    global _producer, _producer_pid
+    pid = os.getpid()
+    if _producer is None or _producer_pid != pid:
+        with _producer_lock:
+            if _producer is None or _producer_pid != pid:
+                _producer = ItemProducer(on_async_failure=_event_lost if ITEMS_READ_MODEL_ENABLED else None)
+                _producer_pid = pid
+                atexit.register(_producer.close)
+    return _producer
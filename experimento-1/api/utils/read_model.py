@@ -0,0 +1,160 @@
+"""
+Valkey-backed read model of items.
+
+The event-consumer is the writer: it applies every `item_created` event
+and periodically reconciles the model against Postgres (the first
+reconcile is the bootstrap). The API reads it. Layout (under `prefix`):
+
+- `<prefix>:data`  hash   item id -> JSON document
+- `<prefix>:ids`   zset   item id scored by id (ordered listing)
+- `<prefix>:ready` string set by a reconcile that found the model complete
+- `<prefix>:gen`   int    bumped (and `ready` dropped) when an event is lost
+
+Writes are idempotent (HSET/ZADD), so a redelivered or retried event is
+harmless. Until `ready` exists (first start, Valkey flushed, an event
+could not be published) list reads return None and the API falls back
+to the database; an id missing from the model is also looked up in the
+database, since events are applied asynchronously.
+"""
+import json
+import logging
+import os
+import threading
+
+import redis
+from sqlalchemy import text
+
+from config import VALKEY_HOST, VALKEY_PORT, VALKEY_TIMEOUT_SEC, ITEMS_READ_MODEL_PREFIX
+
+logger = logging.getLogger(__name__)
+
+
+class ItemReadModel:
+    """Items projected into Valkey for reads that do not touch Postgres."""
+
+    def __init__(self, client, prefix=ITEMS_READ_MODEL_PREFIX):
+        self.client = client
+        self.data_key = f"{prefix}:data"
+        self.ids_key = f"{prefix}:ids"
+        self.ready_key = f"{prefix}:ready"
+        self.gen_key = f"{prefix}:gen"
+
+    def apply_created(self, item):
+        """Upsert one item (from an item_created event)."""
+        self.apply_many([item])
+
+    def apply_many(self, items):
+        pipe = self.client.pipeline(transaction=False)
+        for item in items:
+            item_id = int(item["id"])
+            pipe.hset(self.data_key, item_id, json.dumps({"id": item_id, "name": item.get("name")}))
+            pipe.zadd(self.ids_key, {item_id: item_id})
+        pipe.execute()
+
+    def get(self, item_id):
+        """The item as a dict, or None if the model does not have it (yet)."""
+        raw = self.client.hget(self.data_key, item_id)
+        return json.loads(raw) if raw is not None else None
+
+    def list(self, after_id=0, limit=None):
+        """Items with id > after_id ordered by id (at most `limit`), or None while not bootstrapped."""
+        pipe = self.client.pipeline(transaction=False)
+        pipe.exists(self.ready_key)
+        if limit is None:
+            pipe.zrangebyscore(self.ids_key, f"({after_id}", "+inf")
+        else:
+            pipe.zrangebyscore(self.ids_key, f"({after_id}", "+inf", start=0, num=limit)
+        ready, ids = pipe.execute()
+        if not ready:
+            return None
+        if not ids:
+            return []
+        return [json.loads(raw) for raw in self.client.hmget(self.data_key, ids) if raw is not None]
+
+    def is_ready(self):
+        return bool(self.client.exists(self.ready_key))
+
+    def mark_stale(self):
+        """An item_created event was lost: serve from the DB until the next reconcile."""
+        pipe = self.client.pipeline(transaction=False)
+        pipe.incr(self.gen_key)
+        pipe.delete(self.ready_key)
+        pipe.execute()
+
+    def reconcile(self, engine, batch_size=1000):
+        """
+        Copy into the model every DB row it is missing, then mark it ready.
+
+        Items are insert-only, so equal counts mean the model is complete and
+        the check is one COUNT; otherwise ids are compared page by page. Returns
+        how many items were added.
+        """
+        generation = self.client.get(self.gen_key)
+        added = 0
+        with engine.begin() as conn:
+            # A write first: pgpool keeps the rest of the transaction on the primary (no replica lag)
+            conn.execute(text("CREATE TABLE IF NOT EXISTS items (id SERIAL PRIMARY KEY, name TEXT)"))
+            db_count = conn.execute(text("SELECT count(*) FROM items")).scalar_one()
+            model_count = self.client.zcard(self.ids_key)
+            if model_count > db_count:
+                # Ids the DB no longer has (database recreated): rebuild from scratch
+                self.client.delete(self.data_key, self.ids_key)
+                model_count = 0
+
+            after_id = 0
+            while model_count != db_count:
+                rows = conn.execute(
+                    text("SELECT id, name FROM items WHERE id > :after_id ORDER BY id LIMIT :limit"),
+                    {"after_id": after_id, "limit": batch_size},
+                ).all()
+                if not rows:
+                    break
+                known = {int(i) for i in self.client.zrangebyscore(self.ids_key, f"({after_id}", rows[-1].id)}
+                missing = [{"id": r.id, "name": r.name} for r in rows if r.id not in known]
+                if missing:
+                    self.apply_many(missing)
+                    added += len(missing)
+                    model_count += len(missing)
+                after_id = rows[-1].id
+
+        # Only if no event was lost meanwhile (that row may have been missed by this pass)
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(self.gen_key)
+                if pipe.get(self.gen_key) == generation:
+                    pipe.multi()
+                    pipe.set(self.ready_key, "1")
+                    pipe.execute()
+            except redis.WatchError:
+                pass
+        return added
+
+    def snapshot(self):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.exists(self.ready_key)
+        pipe.zcard(self.ids_key)
+        ready, count = pipe.execute()
+        return {"ready": bool(ready), "items": count}
+
+
+_read_model = None
+_read_model_pid = None
+_read_model_lock = threading.Lock()
+
+
+def get_read_model():
+    """Process-wide ItemReadModel (re-created after a fork, like get_producer)."""
+    global _read_model, _read_model_pid
+    pid = os.getpid()
+    if _read_model is None or _read_model_pid != pid:
+        with _read_model_lock:
+            if _read_model is None or _read_model_pid != pid:
+                client = redis.Redis(
+                    host=VALKEY_HOST,
+                    port=VALKEY_PORT,
+                    socket_timeout=VALKEY_TIMEOUT_SEC,
+                    socket_connect_timeout=VALKEY_TIMEOUT_SEC,
+                )
+                _read_model = ItemReadModel(client)
+                _read_model_pid = pid
+    return _read_model
@@ -0,0 +1,98 @@
+import time
+
+import pybreaker
+
+
+class AsyncCircuitBreaker:
+    """
+    Equivalente asyncio de pybreaker.CircuitBreaker para el motor async.
+
+    pybreaker protege cada call() con un RLock de threading, lo que no sirve
+    dentro de un event loop (bloquearía el loop completo). Aquí todo corre en
+    el hilo del loop, así que las transiciones entre awaits son atómicas y no
+    hace falta lock. Se mantiene la misma semántica que pybreaker:
+      - CLOSED:    cuenta fallos consecutivos; al llegar a fail_max abre y
+                   lanza CircuitBreakerError (como throw_new_error_on_trip)
+      - OPEN:      falla rápido hasta que pasen reset_timeout segundos
+      - HALF-OPEN: deja pasar UNA llamada de prueba; el resto falla rápido
+    Los listeners reciben los mismos callbacks que un CircuitBreakerListener.
+    """
+
+    def __init__(self, fail_max: int, reset_timeout: float, listeners=None, name: str | None = None):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self._listeners = list(listeners or [])
+
+        self._state = pybreaker.STATE_CLOSED
+        self._fail_counter = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def current_state(self) -> str:
+        return self._state
+
+    @property
+    def fail_counter(self) -> int:
+        return self._fail_counter
+
+    def _set_state(self, new_state: str):
+        old_state = self._state
+        self._state = new_state
+        if new_state == pybreaker.STATE_OPEN:
+            self._opened_at = time.monotonic()
+        for listener in self._listeners:
+            listener.state_change(self, old_state, new_state)
+
+    def _before_call(self):
+        if self._state == pybreaker.STATE_OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise pybreaker.CircuitBreakerError("Timeout not elapsed yet, circuit breaker still open")
+            self._set_state(pybreaker.STATE_HALF_OPEN)
+
+        if self._state == pybreaker.STATE_HALF_OPEN:
+            if self._trial_in_flight:
+                raise pybreaker.CircuitBreakerError("Circuit breaker half-open, trial call in flight")
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def _on_failure(self, exc: BaseException, trial: bool):
+        self._fail_counter += 1
+        for listener in self._listeners:
+            listener.failure(self, exc)
+
+        if trial:
+            self._set_state(pybreaker.STATE_OPEN)
+            raise pybreaker.CircuitBreakerError("Trial call failed, circuit breaker opened") from exc
+
+        if self._state == pybreaker.STATE_CLOSED and self._fail_counter >= self.fail_max:
+            self._set_state(pybreaker.STATE_OPEN)
+            raise pybreaker.CircuitBreakerError("Failures threshold reached, circuit breaker opened") from exc
+
+    def _on_success(self, trial: bool):
+        self._fail_counter = 0
+        if trial:
+            self._set_state(pybreaker.STATE_CLOSED)
+        for listener in self._listeners:
+            listener.success(self)
+
+    async def call(self, func, *args, **kwargs):
+        """
+        Ejecuta await func(*args, **kwargs) según el estado actual del breaker.
+        """
+        trial = self._before_call()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as exc:
+            self._on_failure(exc, trial)
+            raise
+        finally:
+            # Si la corrutina se cancela (CancelledError) no cuenta como fallo,
+            # pero hay que liberar el slot de prueba del half-open.
+            if trial:
+                self._trial_in_flight = False
+
+        self._on_success(trial)
+        return result
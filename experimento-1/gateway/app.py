@@ -1,22 +1,88 @@
-import os
-from flask import Flask, jsonify, request, Response
+import time
+
+from flask import Flask, g, jsonify, request, Response
 import requests
 import pybreaker
 
-app = Flask(__name__)
-
-# -------------------------
-# Config (env vars)
-# -------------------------
-UPSTREAM_API_BASE = os.getenv("UPSTREAM_API_BASE", "http://api:5000")
-PAYMENT_BASE = os.getenv("PAYMENT_BASE", "http://payment-mock:8080")
+import metrics
+
+from config import (
+    UPSTREAM_API_BASE,
+    PAYMENT_BASE,
+    UPSTREAM_TIMEOUT_SEC,
+    CB_FAIL_MAX,
+    CB_RESET_TIMEOUT,
+    CB_MODE,
+    CB_WINDOW_TYPE,
+    CB_WINDOW_SIZE,
+    CB_MIN_CALLS,
+    CB_FAILURE_RATE_THRESHOLD,
+    CB_SLOW_CALL_RATE_THRESHOLD,
+    CB_SLOW_CALL_DURATION_SEC,
+    CB_HALF_OPEN_PERMITTED_CALLS,
+    CB_STATE_STORE,
+    CB_SHM_DIR,
+    VALKEY_HOST,
+    VALKEY_PORT,
+    BULKHEAD_INITIAL_LIMIT,
+    BULKHEAD_MIN_LIMIT,
+    BULKHEAD_MAX_LIMIT,
+    BULKHEAD_LATENCY_TARGET_SEC,
+    BULKHEAD_BACKOFF_RATIO,
+    UPSTREAM_POOL_MAXSIZE,
+    UPSTREAM_POOL_BLOCK,
+    UPSTREAM_POOL_MAX_IDLE_SEC,
+    CACHE_ENABLED,
+    CACHE_TTL_SEC,
+    CACHE_STALE_WHILE_REVALIDATE_SEC,
+    CACHE_STALE_IF_ERROR_SEC,
+    CACHE_MAX_ENTRIES,
+    CACHE_MAX_BYTES,
+    CACHE_MAX_ENTRY_BYTES,
+    SINGLEFLIGHT_ENABLED,
+    SINGLEFLIGHT_MAX_WAITERS,
+    SINGLEFLIGHT_MAX_BODY_BYTES,
+    HEDGE_ENABLED,
+    LOG_LEVEL,
+    LOG_ASYNC,
+    LOG_JSON,
+    LOG_QUEUE_SIZE,
+    LOG_SUCCESS_SAMPLE_EVERY,
+    HEDGE_PERCENTILE,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_MIN_DELAY_SEC,
+    HEDGE_POOL_SIZE,
+    RETRY_BUDGET_RATIO,
+    RETRY_BUDGET_MAX_TOKENS,
+    PROXY_STREAMING,
+    PROXY_STREAM_THRESHOLD_BYTES,
+    PROXY_STREAM_CHUNK_SIZE,
+)
+from async_logging import setup_async_logging
+from breaker_store import build_state_storage, storage_view
+from bulkhead import AdaptiveBulkhead, BulkheadFullError
+from hedging import Hedger, LatencyTracker, RetryBudget
+from pool import UpstreamPool
+from proxy_headers import content_length as upstream_content_length, forward_headers
+from response_cache import CachedResponse, ResponseCache
+from singleflight import FOLLOWER, SingleFlight
+from window_breaker import CountWindow, SlidingWindowCircuitBreaker, TimeWindow
 
-# Timeout del request al upstream (corto para fail-fast)
-UPSTREAM_TIMEOUT_SEC = float(os.getenv("UPSTREAM_TIMEOUT_SEC", "1.5"))
+app = Flask(__name__)
 
-# Circuit breaker parameters
-CB_FAIL_MAX = int(os.getenv("CB_FAIL_MAX", "5"))              # fallos para abrir
-CB_RESET_TIMEOUT = int(os.getenv("CB_RESET_TIMEOUT", "15"))   # segundos abierto antes de half-open
+# Logs del request encolados; el write a stderr lo hace un thread de fondo
+if LOG_ASYNC:
+    async_logging = setup_async_logging(
+        app.logger,
+        level=LOG_LEVEL,
+        json_lines=LOG_JSON,
+        queue_size=LOG_QUEUE_SIZE,
+        success_sample_every=LOG_SUCCESS_SAMPLE_EVERY,
+        on_drop=metrics.log_dropped
+    )
+else:
+    async_logging = None
+    app.logger.setLevel(LOG_LEVEL)
 
 
 # -------------------------
@@ -45,6 +111,7 @@ def state_name_any(state_obj) -> str:
 class CBListener(pybreaker.CircuitBreakerListener):
     def state_change(self, cb, old_state, new_state):
         app.logger.warning(f"[CB] state_change {state_name_any(old_state)} -> {state_name_any(new_state)}")
+        metrics.breaker_transition(cb.name, state_name_any(old_state), state_name_any(new_state))
 
     def failure(self, cb, exc):
         app.logger.warning(f"[CB] failure: {type(exc).__name__}: {exc}")
@@ -53,21 +120,141 @@ class CBListener(pybreaker.CircuitBreakerListener):
         app.logger.info("[CB] success")
 
 
-breaker_api = pybreaker.CircuitBreaker(
-    fail_max=CB_FAIL_MAX,
-    reset_timeout=CB_RESET_TIMEOUT,
-    listeners=[CBListener()],
-    name="api-breaker"
+# Estado compartido: un OPEN decidido por un worker/réplica lo ven todos en el siguiente call()
+store_api = build_state_storage(
+    CB_STATE_STORE, "api-breaker", shm_dir=CB_SHM_DIR, valkey_host=VALKEY_HOST, valkey_port=VALKEY_PORT
+)
+store_payment = build_state_storage(
+    CB_STATE_STORE, "payment-breaker", shm_dir=CB_SHM_DIR, valkey_host=VALKEY_HOST, valkey_port=VALKEY_PORT
+)
+
+def build_breaker(name: str, state_storage):
+    """
+    CB_MODE=consecutive -> pybreaker (CB_FAIL_MAX fallos seguidos)
+    CB_MODE=window      -> tasa de fallos / llamadas lentas en ventana deslizante
+    """
+    if CB_MODE == "window":
+        window = TimeWindow(CB_WINDOW_SIZE) if CB_WINDOW_TYPE == "time" else CountWindow(CB_WINDOW_SIZE)
+        return SlidingWindowCircuitBreaker(
+            window=window,
+            min_calls=CB_MIN_CALLS,
+            failure_rate_threshold=CB_FAILURE_RATE_THRESHOLD,
+            slow_call_rate_threshold=CB_SLOW_CALL_RATE_THRESHOLD,
+            slow_call_duration_sec=CB_SLOW_CALL_DURATION_SEC,
+            reset_timeout=CB_RESET_TIMEOUT,
+            half_open_permitted_calls=CB_HALF_OPEN_PERMITTED_CALLS,
+            state_storage=state_storage,
+            listeners=[CBListener()],
+            name=name
+        )
+
+    return pybreaker.CircuitBreaker(
+        fail_max=CB_FAIL_MAX,
+        reset_timeout=CB_RESET_TIMEOUT,
+        listeners=[CBListener()],
+        state_storage=state_storage,
+        name=name
+    )
+
+
+breaker_api = build_breaker("api-breaker", store_api)
+breaker_payment = build_breaker("payment-breaker", store_payment)
+
+for _cb in (breaker_api, breaker_payment):
+    metrics.BREAKER_STATE.labels(_cb.name).set(metrics.BREAKER_STATE_VALUES.get(breaker_state_name(_cb), -1))
+
+
+# -------------------------
+# Bulkheads adaptativos por upstream (delante de cada breaker)
+# -------------------------
+def build_bulkhead(name: str) -> AdaptiveBulkhead:
+    return AdaptiveBulkhead(
+        name=name,
+        initial_limit=BULKHEAD_INITIAL_LIMIT,
+        min_limit=BULKHEAD_MIN_LIMIT,
+        max_limit=BULKHEAD_MAX_LIMIT,
+        latency_target_sec=BULKHEAD_LATENCY_TARGET_SEC,
+        backoff_ratio=BULKHEAD_BACKOFF_RATIO,
+        # Un rechazo del breaker no dice nada de la latencia del upstream
+        ignored_exceptions=(pybreaker.CircuitBreakerError,)
+    )
+
+
+bulkhead_api = build_bulkhead("api-bulkhead")
+bulkhead_payment = build_bulkhead("payment-bulkhead")
+
+
+# -------------------------
+# Pools HTTP keep-alive (evitan un handshake TCP por request)
+# -------------------------
+pool_api = UpstreamPool(
+    name="api-pool",
+    maxsize=UPSTREAM_POOL_MAXSIZE,
+    block=UPSTREAM_POOL_BLOCK,
+    max_idle_sec=UPSTREAM_POOL_MAX_IDLE_SEC
+)
+
+pool_payment = UpstreamPool(
+    name="payment-pool",
+    maxsize=UPSTREAM_POOL_MAXSIZE,
+    block=UPSTREAM_POOL_BLOCK,
+    max_idle_sec=UPSTREAM_POOL_MAX_IDLE_SEC
+)
+
+
+# -------------------------
+# Cache de respuestas (por worker) para GETs idempotentes
+# -------------------------
+items_cache = ResponseCache(
+    ttl_sec=CACHE_TTL_SEC,
+    stale_while_revalidate_sec=CACHE_STALE_WHILE_REVALIDATE_SEC,
+    stale_if_error_sec=CACHE_STALE_IF_ERROR_SEC,
+    max_entries=CACHE_MAX_ENTRIES,
+    max_bytes=CACHE_MAX_BYTES,
+    max_entry_bytes=CACHE_MAX_ENTRY_BYTES
 )
 
-breaker_payment = pybreaker.CircuitBreaker(
-    fail_max=CB_FAIL_MAX,
-    reset_timeout=CB_RESET_TIMEOUT,
-    listeners=[CBListener()],
-    name="payment-breaker"
+# Coalescing de GETs idénticos concurrentes (por worker)
+items_flight = SingleFlight(max_waiters=SINGLEFLIGHT_MAX_WAITERS)
+
+
+# -------------------------
+# Hedging + retry budget para GETs idempotentes (por worker)
+# -------------------------
+def _retryable(exc: Exception) -> bool:
+    # Solo fallos rápidos de conexión; reintentar un timeout duplicaría la espera
+    return isinstance(exc, requests.ConnectionError) and not isinstance(exc, requests.Timeout)
+
+
+items_hedger = Hedger(
+    tracker=LatencyTracker(percentile=HEDGE_PERCENTILE, min_samples=HEDGE_MIN_SAMPLES),
+    budget=RetryBudget(ratio=RETRY_BUDGET_RATIO, max_tokens=RETRY_BUDGET_MAX_TOKENS),
+    min_delay_sec=HEDGE_MIN_DELAY_SEC,
+    max_delay_sec=UPSTREAM_TIMEOUT_SEC,
+    pool_size=HEDGE_POOL_SIZE,
+    retryable=_retryable,
+    discard=lambda resp: resp.close(),
+    on_event=metrics.hedging_event
 )
 
 
+# -------------------------
+# Instrumentación por request
+# -------------------------
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.observe_request(route, request.method, response.status_code, time.perf_counter() - started)
+    return response
+
+
 # -------------------------
 # Routes
 # -------------------------
@@ -76,60 +263,266 @@ def health():
     return "ok", 200
 
 
+@app.get("/metrics")
+def prometheus_metrics():
+    """
+    Exposición Prometheus agregada entre todos los workers gunicorn.
+    """
+    body, content_type = metrics.render()
+    return Response(body, status=200, content_type=content_type)
+
+
 @app.get("/cb/state")
 def cb_state():
-    return jsonify({
+    body = {
         "api_breaker": breaker_state_name(breaker_api),
         "payment_breaker": breaker_state_name(breaker_payment),
+        "mode": CB_MODE,
         "fail_max": CB_FAIL_MAX,
-        "reset_timeout_sec": CB_RESET_TIMEOUT
+        "reset_timeout_sec": CB_RESET_TIMEOUT,
+        "state_store": CB_STATE_STORE,
+        "cluster": {
+            "api_breaker": storage_view(store_api),
+            "payment_breaker": storage_view(store_payment)
+        }
+    }
+    if CB_MODE == "window":
+        # Métricas de la ventana de ESTE worker
+        body["window"] = {
+            "type": CB_WINDOW_TYPE,
+            "size": CB_WINDOW_SIZE,
+            "api_breaker": breaker_api.snapshot(),
+            "payment_breaker": breaker_payment.snapshot()
+        }
+    return jsonify(body), 200
+
+
+@app.get("/bulkhead/state")
+def bulkhead_state():
+    """
+    Límite actual / en vuelo / rechazados de los bulkheads de ESTE worker.
+    """
+    return jsonify({
+        "api_bulkhead": bulkhead_api.snapshot(),
+        "payment_bulkhead": bulkhead_payment.snapshot()
+    }), 200
+
+
+@app.get("/cache/state")
+def cache_state():
+    """
+    Ocupación del cache de respuestas y coalescing (single-flight) de ESTE worker.
+    """
+    return jsonify({
+        "enabled": CACHE_ENABLED,
+        **items_cache.snapshot(),
+        "singleflight": {"enabled": SINGLEFLIGHT_ENABLED, **items_flight.snapshot()}
+    }), 200
+
+
+@app.get("/hedging/state")
+def hedging_state():
+    """
+    Delay de hedge actual (percentil observado) y retry budget de ESTE worker.
+    """
+    return jsonify({"enabled": HEDGE_ENABLED, "api": items_hedger.snapshot()}), 200
+
+
+@app.get("/logging/state")
+def logging_state():
+    """
+    Cola de logs de ESTE worker: encolados, descartados y muestreados.
+    """
+    if async_logging is None:
+        return jsonify({"async": False, "level": LOG_LEVEL}), 200
+    return jsonify({"async": True, "level": LOG_LEVEL, **async_logging.snapshot()}), 200
+
+
+@app.get("/pool/stats")
+def pool_stats():
+    """
+    Hits/misses de los pools keep-alive de ESTE worker (cada worker gunicorn tiene los suyos).
+    """
+    return jsonify({
+        "api_pool": pool_api.state(),
+        "payment_pool": pool_payment.state()
     }), 200
 
 
 def _proxy_response(resp: requests.Response) -> Response:
     """
-    Preserva status + body + Content-Type del upstream tal cual.
+    Preserva status + headers + body del upstream tal cual.
+
+    El request al upstream se hace con stream=True:
+      - cuerpos con Content-Length <= PROXY_STREAM_THRESHOLD_BYTES se bufferizan (camino barato)
+      - el resto (o sin Content-Length, p.ej. chunked) se reenvía en chunks de
+        PROXY_STREAM_CHUNK_SIZE a medida que llegan, sin cargar el body completo en memoria
+    """
+    content_type = resp.headers.get("Content-Type", "application/json")
+    headers = forward_headers(resp.headers)
+
+    content_length = upstream_content_length(resp.headers)
+    small_body = content_length is not None and content_length <= PROXY_STREAM_THRESHOLD_BYTES
+
+    if not PROXY_STREAMING or small_body:
+        return Response(resp.content, status=resp.status_code, headers=headers, content_type=content_type)
+
+    proxied = Response(
+        resp.iter_content(chunk_size=PROXY_STREAM_CHUNK_SIZE),
+        status=resp.status_code,
+        headers=headers,
+        content_type=content_type
+    )
+    # Devuelve la conexión al pool aunque el cliente corte la descarga a mitad
+    proxied.call_on_close(resp.close)
+    return proxied
+
+
+# -------------------------
+# Cache de respuestas para GET /api/items
+# -------------------------
+def _cached_response(entry, cache_status: str) -> Response:
+    response = Response(entry.body, status=entry.status, headers=entry.headers, content_type=entry.content_type)
+    response.headers["X-Cache"] = cache_status
+    response.headers["Age"] = str(entry.age())
+    return response
+
+
+def _fetch_items(query: str = "") -> requests.Response:
+    # El query string (cursor after_id/limit, stream) viaja tal cual; también es parte de la clave de cache
+    url = f"{UPSTREAM_API_BASE}/api/v1/items" + (f"?{query}" if query else "")
+    with metrics.upstream_timer("api"):
+        return pool_api.get(url, timeout=UPSTREAM_TIMEOUT_SEC, stream=True)
+
+
+def _fetch_items_hedged(query: str = "") -> requests.Response:
+    """
+    Con HEDGE_ENABLED, un intento extra tras el p95 observado (solo con el breaker
+    CLOSED: en HALF-OPEN la prueba debe ser una sola llamada).
+    """
+    if not HEDGE_ENABLED:
+        return _fetch_items(query)
+    return items_hedger.call(lambda: _fetch_items(query), hedge=breaker_state_name(breaker_api) == pybreaker.STATE_CLOSED)
+
+
+def _load_items(cache_key: str):
+    """
+    Una ida real al upstream (bulkhead + breaker). Si el body es acotado se
+    bufferiza en un CachedResponse (compartible entre followers del
+    single-flight y guardado en cache si es un 200); si no, se devuelve la
+    respuesta cruda para streamearla.
     """
+    with bulkhead_api.slot():
+        resp = breaker_api.call(_fetch_items_hedged, cache_key.partition("?")[2])
+
+    content_length = upstream_content_length(resp.headers)
+    if not (SINGLEFLIGHT_ENABLED or CACHE_ENABLED):
+        return resp
+    if content_length is None or content_length > SINGLEFLIGHT_MAX_BODY_BYTES:
+        return resp
+
     content_type = resp.headers.get("Content-Type", "application/json")
-    return Response(resp.content, status=resp.status_code, content_type=content_type)
+    entry = CachedResponse(resp.status_code, forward_headers(resp.headers), content_type, resp.content, time.monotonic())
+    if CACHE_ENABLED and resp.status_code == 200 and items_cache.fits(content_length):
+        items_cache.store(cache_key, entry)
+    return entry
+
+
+def _load_items_coalesced(cache_key: str):
+    """
+    GETs idénticos concurrentes comparten una sola llamada al upstream.
+    """
+    if not SINGLEFLIGHT_ENABLED:
+        return _load_items(cache_key)
+
+    result, role = items_flight.do(cache_key, lambda: _load_items(cache_key))
+    metrics.singleflight(role)
+    if role == FOLLOWER and isinstance(result, requests.Response):
+        # Body grande sin bufferizar: el stream es del leader, este request hace su propia llamada
+        return _load_items(cache_key)
+    return result
+
+
+def _refresh_items(cache_key: str):
+    """
+    Revalidación en background (stale-while-revalidate): pasa por bulkhead + breaker igual que un request.
+    """
+    result = _load_items_coalesced(cache_key)
+    if isinstance(result, requests.Response):
+        result.close()
+
+
+def _stale_or(cache_key: str, error_body, status: int):
+    """
+    stale-if-error: si el upstream no está disponible y hay una copia aceptable, se sirve esa.
+    """
+    if CACHE_ENABLED:
+        entry = items_cache.lookup_stale_if_error(cache_key)
+        if entry is not None:
+            metrics.cache_lookup("stale_if_error")
+            return _cached_response(entry, "STALE")
+    return error_body, status
 
 
 @app.get("/api/items")
 def proxy_items():
     """
-    Proxy protegido por circuit breaker hacia UPSTREAM_API_BASE + /items
+    Proxy protegido por circuit breaker hacia UPSTREAM_API_BASE + /items,
+    con cache de respuestas (X-Cache: HIT|STALE|MISS) delante.
     """
-    upstream_url = f"{UPSTREAM_API_BASE}/api/v1/items"
+    cache_key = request.full_path
+
+    if CACHE_ENABLED:
+        entry, freshness = items_cache.lookup(cache_key)
+        if freshness == ResponseCache.FRESH:
+            metrics.cache_lookup("hit")
+            return _cached_response(entry, "HIT")
+        if freshness == ResponseCache.STALE:
+            metrics.cache_lookup("stale")
+            items_cache.revalidate_async(cache_key, lambda: _refresh_items(cache_key))
+            return _cached_response(entry, "STALE")
+        metrics.cache_lookup("miss")
 
     try:
-        def _call():
-            return requests.get(upstream_url, timeout=UPSTREAM_TIMEOUT_SEC)
-
-        resp = breaker_api.call(_call)
-        return _proxy_response(resp)
+        result = _load_items_coalesced(cache_key)
+        if isinstance(result, CachedResponse):
+            return _cached_response(result, "MISS")
+        response = _proxy_response(result)
+        response.headers["X-Cache"] = "MISS"
+        return response
+
+    except BulkheadFullError:
+        metrics.upstream_rejected("api", "bulkhead")
+        # Demasiados requests en vuelo hacia el API en este worker: rechazo inmediato
+        return _stale_or(cache_key, jsonify({
+            "error": "UPSTREAM_OVERLOADED",
+            "bulkhead": "FULL",
+            "message": f"Too many in-flight requests to upstream (limit {bulkhead_api.limit})"
+        }), 503)
 
     except pybreaker.CircuitBreakerError:
         # Circuito OPEN: respuesta inmediata (fail-fast), sin tocar upstream
-        return jsonify({
+        metrics.upstream_rejected("api", "breaker")
+        return _stale_or(cache_key, jsonify({
             "error": "UPSTREAM_UNAVAILABLE",
             "breaker": "OPEN",
             "message": "Circuit breaker is open. Failing fast."
-        }), 503
+        }), 503)
 
     except requests.Timeout:
         # Timeout cuenta como fallo -> breaker suma
-        return jsonify({
+        return _stale_or(cache_key, jsonify({
             "error": "UPSTREAM_TIMEOUT",
             "breaker": breaker_state_name(breaker_api),
             "message": f"Upstream timeout after {UPSTREAM_TIMEOUT_SEC}s"
-        }), 504
+        }), 504)
 
     except requests.RequestException as e:
-        return jsonify({
+        return _stale_or(cache_key, jsonify({
             "error": "UPSTREAM_ERROR",
             "breaker": breaker_state_name(breaker_api),
             "message": str(e)
-        }), 502
+        }), 502)
 
 
 @app.post("/api/payments/process")
@@ -144,12 +537,23 @@ def proxy_payment():
 
     try:
         def _call():
-            return requests.post(upstream_url, timeout=UPSTREAM_TIMEOUT_SEC)
+            with metrics.upstream_timer("payment"):
+                return pool_payment.post(upstream_url, timeout=UPSTREAM_TIMEOUT_SEC, stream=True)
 
-        resp = breaker_payment.call(_call)
+        with bulkhead_payment.slot():
+            resp = breaker_payment.call(_call)
         return _proxy_response(resp)
 
+    except BulkheadFullError:
+        metrics.upstream_rejected("payment", "bulkhead")
+        return jsonify({
+            "error": "PAYMENT_OVERLOADED",
+            "bulkhead": "FULL",
+            "message": f"Too many in-flight requests to payment (limit {bulkhead_payment.limit})"
+        }), 503
+
     except pybreaker.CircuitBreakerError:
+        metrics.upstream_rejected("payment", "breaker")
         return jsonify({
             "error": "PAYMENT_UNAVAILABLE",
             "breaker": "OPEN",
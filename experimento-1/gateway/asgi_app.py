@@ -0,0 +1,298 @@
+"""
+Motor async (GATEWAY_ENGINE=async) del gateway con circuit breaker.
+
+Mismas rutas y mismos cuerpos de error que app.py, pero servido con
+Quart + uvicorn y un cliente httpx.AsyncClient por upstream: una llamada
+lenta (p.ej. toxic de latencia 2s en toxiproxy) solo ocupa una corrutina,
+no un thread de gunicorn, así que un proceso puede sostener miles de
+requests en vuelo hacia el upstream.
+
+Comparte con app.py las métricas, el logging async y el streaming del
+body. No tiene (aún) cache de respuestas, single-flight, bulkhead, hedging
+ni el breaker por ventana / con estado compartido: esos módulos son de
+threads. serve.py avisa o no arranca si se configuran con este motor.
+"""
+import time
+
+import httpx
+import pybreaker
+from quart import Quart, g, jsonify, request, Response
+
+import metrics
+from aiobreaker import AsyncCircuitBreaker
+from async_logging import setup_async_logging
+from config import (
+    UPSTREAM_API_BASE,
+    PAYMENT_BASE,
+    UPSTREAM_TIMEOUT_SEC,
+    CB_FAIL_MAX,
+    CB_RESET_TIMEOUT,
+    UPSTREAM_POOL_MAXSIZE,
+    UPSTREAM_POOL_BLOCK,
+    UPSTREAM_POOL_MAX_IDLE_SEC,
+    LOG_LEVEL,
+    LOG_ASYNC,
+    LOG_JSON,
+    LOG_QUEUE_SIZE,
+    LOG_SUCCESS_SAMPLE_EVERY,
+    PROXY_STREAMING,
+    PROXY_STREAM_THRESHOLD_BYTES,
+    PROXY_STREAM_CHUNK_SIZE,
+)
+from proxy_headers import content_length as upstream_content_length, forward_headers
+
+app = Quart(__name__)
+
+# Aquí el writer de fondo importa más que en sync: un write a stderr bloquearía el event loop
+if LOG_ASYNC:
+    async_logging = setup_async_logging(
+        app.logger,
+        level=LOG_LEVEL,
+        json_lines=LOG_JSON,
+        queue_size=LOG_QUEUE_SIZE,
+        success_sample_every=LOG_SUCCESS_SAMPLE_EVERY,
+        on_drop=metrics.log_dropped
+    )
+else:
+    async_logging = None
+    app.logger.setLevel(LOG_LEVEL)
+
+
+# -------------------------
+# Circuit breaker listeners (mismos logs que el motor sync)
+# -------------------------
+class AsyncCBListener:
+    def state_change(self, cb, old_state, new_state):
+        app.logger.warning(f"[CB] state_change {old_state} -> {new_state}")
+        metrics.breaker_transition(cb.name, old_state, new_state)
+
+    def failure(self, cb, exc):
+        app.logger.warning(f"[CB] failure: {type(exc).__name__}: {exc}")
+
+    def success(self, cb):
+        app.logger.info("[CB] success")
+
+
+breaker_api = AsyncCircuitBreaker(
+    fail_max=CB_FAIL_MAX,
+    reset_timeout=CB_RESET_TIMEOUT,
+    listeners=[AsyncCBListener()],
+    name="api-breaker"
+)
+
+breaker_payment = AsyncCircuitBreaker(
+    fail_max=CB_FAIL_MAX,
+    reset_timeout=CB_RESET_TIMEOUT,
+    listeners=[AsyncCBListener()],
+    name="payment-breaker"
+)
+
+for _cb in (breaker_api, breaker_payment):
+    metrics.BREAKER_STATE.labels(_cb.name).set(metrics.BREAKER_STATE_VALUES.get(_cb.current_state, -1))
+
+
+# -------------------------
+# Clientes HTTP async (uno por upstream, creados dentro del event loop)
+# -------------------------
+def _limits() -> httpx.Limits:
+    # Sin UPSTREAM_POOL_BLOCK no hay tope de conexiones en vuelo (igual que el pool sync);
+    # solo se conservan UPSTREAM_POOL_MAXSIZE conexiones keep-alive.
+    return httpx.Limits(
+        max_connections=UPSTREAM_POOL_MAXSIZE if UPSTREAM_POOL_BLOCK else None,
+        max_keepalive_connections=UPSTREAM_POOL_MAXSIZE,
+        keepalive_expiry=UPSTREAM_POOL_MAX_IDLE_SEC
+    )
+
+
+clients: dict[str, httpx.AsyncClient] = {}
+
+
+@app.before_serving
+async def open_clients():
+    timeout = httpx.Timeout(UPSTREAM_TIMEOUT_SEC)
+    clients["api"] = httpx.AsyncClient(timeout=timeout, limits=_limits())
+    clients["payment"] = httpx.AsyncClient(timeout=timeout, limits=_limits())
+
+
+@app.after_serving
+async def close_clients():
+    for client in clients.values():
+        await client.aclose()
+    clients.clear()
+
+
+# -------------------------
+# Instrumentación por request
+# -------------------------
+@app.before_request
+async def start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+async def record_request(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.observe_request(route, request.method, response.status_code, time.perf_counter() - started)
+    return response
+
+
+# -------------------------
+# Routes
+# -------------------------
+@app.get("/health")
+async def health():
+    return "ok", 200
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(body, status=200, content_type=content_type)
+
+
+@app.get("/cb/state")
+async def cb_state():
+    return jsonify({
+        "api_breaker": breaker_api.current_state,
+        "payment_breaker": breaker_payment.current_state,
+        "fail_max": CB_FAIL_MAX,
+        "reset_timeout_sec": CB_RESET_TIMEOUT,
+        "mode": "consecutive",
+        "state_store": "memory"
+    }), 200
+
+
+@app.get("/logging/state")
+async def logging_state():
+    if async_logging is None:
+        return jsonify({"async": False, "level": LOG_LEVEL}), 200
+    return jsonify({"async": True, "level": LOG_LEVEL, **async_logging.snapshot()}), 200
+
+
+@app.get("/pool/stats")
+async def pool_stats():
+    """
+    httpx no expone hits/misses del pool; se reportan los límites configurados.
+    """
+    return jsonify({
+        "engine": "async",
+        "maxsize_per_host": UPSTREAM_POOL_MAXSIZE,
+        "block": UPSTREAM_POOL_BLOCK,
+        "max_idle_sec": UPSTREAM_POOL_MAX_IDLE_SEC
+    }), 200
+
+
+async def _send(upstream: str, method: str, url: str) -> httpx.Response:
+    """
+    La llamada real (dentro del breaker) con stream=True: vuelven los headers
+    y el body se lee después, en _proxy_response.
+    """
+    client = clients[upstream]
+    with metrics.upstream_timer(upstream):
+        return await client.send(client.build_request(method, url), stream=True)
+
+
+async def _proxy_response(resp: httpx.Response) -> Response:
+    """
+    Preserva status + headers + body del upstream tal cual, con el mismo
+    criterio que app.py: hasta PROXY_STREAM_THRESHOLD_BYTES se bufferiza; el
+    resto (o sin Content-Length) se reenvía en chunks con aiter_bytes, sin
+    cargar el body completo en memoria.
+    """
+    content_type = resp.headers.get("Content-Type", "application/json")
+    headers = forward_headers(resp.headers)
+
+    content_length = upstream_content_length(resp.headers)
+    small_body = content_length is not None and content_length <= PROXY_STREAM_THRESHOLD_BYTES
+
+    if not PROXY_STREAMING or small_body:
+        try:
+            body = await resp.aread()
+        finally:
+            await resp.aclose()
+        return Response(body, status=resp.status_code, headers=headers, content_type=content_type)
+
+    async def body_chunks():
+        # aclose también si el cliente corta la descarga: la conexión vuelve al pool
+        try:
+            async for chunk in resp.aiter_bytes(PROXY_STREAM_CHUNK_SIZE):
+                yield chunk
+        finally:
+            await resp.aclose()
+
+    return Response(body_chunks(), status=resp.status_code, headers=headers, content_type=content_type)
+
+
+@app.get("/api/items")
+async def proxy_items():
+    """
+    Proxy protegido por circuit breaker hacia UPSTREAM_API_BASE + /items
+    """
+    upstream_url = f"{UPSTREAM_API_BASE}/api/v1/items"
+    if request.query_string:
+        upstream_url += "?" + request.query_string.decode()
+
+    try:
+        resp = await breaker_api.call(_send, "api", "GET", upstream_url)
+        return await _proxy_response(resp)
+
+    except pybreaker.CircuitBreakerError:
+        metrics.upstream_rejected("api", "breaker")
+        return jsonify({
+            "error": "UPSTREAM_UNAVAILABLE",
+            "breaker": "OPEN",
+            "message": "Circuit breaker is open. Failing fast."
+        }), 503
+
+    except httpx.TimeoutException:
+        return jsonify({
+            "error": "UPSTREAM_TIMEOUT",
+            "breaker": breaker_api.current_state,
+            "message": f"Upstream timeout after {UPSTREAM_TIMEOUT_SEC}s"
+        }), 504
+
+    except httpx.HTTPError as e:
+        return jsonify({
+            "error": "UPSTREAM_ERROR",
+            "breaker": breaker_api.current_state,
+            "message": str(e)
+        }), 502
+
+
+@app.post("/api/payments/process")
+async def proxy_payment():
+    """
+    Proxy protegido por circuit breaker hacia payment mock:
+    POST {PAYMENT_BASE}/pay?mode=ok|error|slow&delayMs=...
+    """
+    mode = request.args.get("mode", "ok")
+    delay_ms = request.args.get("delayMs", "0")
+    upstream_url = f"{PAYMENT_BASE}/pay?mode={mode}&delayMs={delay_ms}"
+
+    try:
+        resp = await breaker_payment.call(_send, "payment", "POST", upstream_url)
+        return await _proxy_response(resp)
+
+    except pybreaker.CircuitBreakerError:
+        metrics.upstream_rejected("payment", "breaker")
+        return jsonify({
+            "error": "PAYMENT_UNAVAILABLE",
+            "breaker": "OPEN",
+            "message": "Payment circuit breaker is open. Failing fast."
+        }), 503
+
+    except httpx.TimeoutException:
+        return jsonify({
+            "error": "PAYMENT_TIMEOUT",
+            "breaker": breaker_payment.current_state,
+            "message": f"Payment timeout after {UPSTREAM_TIMEOUT_SEC}s"
+        }), 504
+
+    except httpx.HTTPError as e:
+        return jsonify({
+            "error": "PAYMENT_ERROR",
+            "breaker": breaker_payment.current_state,
+            "message": str(e)
+        }), 502
@@ -0,0 +1,138 @@
+"""
+Logging no bloqueante para el gateway.
+
+El thread del request solo arma el LogRecord y lo encola (put_nowait en una
+cola acotada); un thread de fondo (QueueListener) lo formatea como JSON y
+hace el write. Si la cola se llena el record se descarta y se cuenta, en
+vez de frenar al request. Los logs de éxito (INFO o menor) pueden
+muestrearse: se emite 1 de cada `success_sample_every`.
+
+experimento-2/gateway tiene su propia variante (sin métricas, con los
+loggers de módulo del gateway JWT): cada experimento se construye por
+separado, así que no comparten código.
+"""
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        line = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": record.process,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            line["exc"] = self.formatException(record.exc_info)
+        return json.dumps(line, ensure_ascii=False)
+
+
+class _SuccessSampler(logging.Filter):
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._lock = threading.Lock()
+        self._seen = 0
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or self.every == 1:
+            return True
+        with self._lock:
+            self._seen += 1
+            keep = (self._seen - 1) % self.every == 0
+            if not keep:
+                self.sampled_out += 1
+        return keep
+
+
+class _DroppingQueueHandler(QueueHandler):
+    def __init__(self, log_queue: queue.Queue, on_drop):
+        super().__init__(log_queue)
+        self.on_drop = on_drop
+        self.enqueued = 0
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # El formateo (JSON, traceback) queda para el thread de fondo
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+            self.on_drop()
+
+
+class AsyncLogging:
+    def __init__(self, handler: _DroppingQueueHandler, sampler: _SuccessSampler, listener: QueueListener, json_lines: bool):
+        self.handler = handler
+        self.sampler = sampler
+        self.listener = listener
+        self.json_lines = json_lines
+
+    def snapshot(self) -> dict:
+        return {
+            "json": self.json_lines,
+            "queue_size": self.handler.queue.maxsize,
+            "queued_now": self.handler.queue.qsize(),
+            "enqueued": self.handler.enqueued,
+            "dropped": self.handler.dropped,
+            "success_sample_every": self.sampler.every,
+            "sampled_out": self.sampler.sampled_out
+        }
+
+
+def setup_async_logging(
+    logger: logging.Logger,
+    level: str,
+    json_lines: bool,
+    queue_size: int,
+    success_sample_every: int,
+    on_drop=lambda: None,
+) -> AsyncLogging:
+    """
+    Reemplaza los handlers de `logger` por un QueueHandler acotado y arranca el
+    writer de fondo hacia stderr. Se detiene (vaciando la cola) al salir el proceso.
+    """
+    log_queue = queue.Queue(maxsize=queue_size)
+
+    sampler = _SuccessSampler(success_sample_every)
+    handler = _DroppingQueueHandler(log_queue, on_drop)
+    handler.addFilter(sampler)
+
+    writer = logging.StreamHandler(sys.stderr)
+    if json_lines:
+        writer.setFormatter(JsonFormatter())
+    else:
+        writer.setFormatter(logging.Formatter("[%(asctime)s] %(levelname)s in %(module)s: %(message)s"))
+
+    for existing in list(logger.handlers):
+        logger.removeHandler(existing)
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+
+    listener = QueueListener(log_queue, writer, respect_handler_level=False)
+    listener.start()
+
+    def _stop():
+        try:
+            listener.stop()
+        except queue.Full:
+            # Cola llena al salir: el thread es daemon, se pierde lo pendiente
+            pass
+
+    atexit.register(_stop)
+
+    return AsyncLogging(handler, sampler, listener, json_lines)
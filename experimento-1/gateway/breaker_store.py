@@ -0,0 +1,175 @@
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pybreaker
+
+logger = logging.getLogger(__name__)
+
+# -------------------------
+# Backend shm: estado compartido entre workers gunicorn del mismo host
+# -------------------------
+class CircuitSharedMemoryStorage(pybreaker.CircuitBreakerStorage):
+    """
+    Storage de pybreaker respaldado por un archivo mmap en /dev/shm.
+
+    Todos los workers que abren el mismo nombre ven el mismo estado: cuando
+    uno abre el circuito, el siguiente call() de cualquier otro worker lo
+    lee de memoria (sin syscalls) y falla rápido. Todas las escrituras
+    (estado, contador, opened_at) se serializan con flock entre procesos +
+    un Lock entre threads del mismo worker.
+
+    Layout: state (int32) | fail_counter (int32) | opened_at (float64, epoch UTC)
+    """
+
+    _LAYOUT = struct.Struct("<iid")
+    _STATE_OFFSET = 0
+    _COUNTER_OFFSET = 4
+    _OPENED_AT_OFFSET = 8
+    _STATES = (pybreaker.STATE_CLOSED, pybreaker.STATE_OPEN, pybreaker.STATE_HALF_OPEN)
+
+    def __init__(self, state: str, namespace: str, directory: str = "/dev/shm"):
+        super().__init__("shm")
+        self._path = os.path.join(directory, f"cb-{namespace}")
+        self._initial_state = state
+        self._thread_lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._mm = None
+        self._open()
+
+    def _open(self):
+        # Un fd por proceso: flock entre procesos solo funciona si cada worker
+        # tiene su propia open file description (p.ej. si se usó --preload).
+        # Los heredados del fork se cierran antes (solo en este proceso): si no,
+        # cada worker filtra un fd y un mapping.
+        if self._mm is not None:
+            self._mm.close()
+            os.close(self._fd)
+            self._fd = self._mm = None
+        fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_size < self._LAYOUT.size:
+                os.ftruncate(fd, self._LAYOUT.size)
+                os.pwrite(fd, self._LAYOUT.pack(self._STATES.index(self._initial_state), 0, 0.0), 0)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        self._fd = fd
+        self._mm = mmap.mmap(fd, self._LAYOUT.size)
+        self._pid = os.getpid()
+
+    def _buffer(self) -> mmap.mmap:
+        if self._pid != os.getpid():
+            with self._thread_lock:
+                # Otro thread del worker pudo reabrir mientras se esperaba el lock
+                if self._pid != os.getpid():
+                    self._open()
+        return self._mm
+
+    @contextmanager
+    def _locked(self):
+        buf = self._buffer()
+        with self._thread_lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield buf
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @property
+    def state(self) -> str:
+        (index,) = struct.unpack_from("<i", self._buffer(), self._STATE_OFFSET)
+        return self._STATES[index]
+
+    @state.setter
+    def state(self, state: str):
+        with self._locked() as buf:
+            struct.pack_into("<i", buf, self._STATE_OFFSET, self._STATES.index(state))
+
+    def increment_counter(self):
+        with self._locked() as buf:
+            (counter,) = struct.unpack_from("<i", buf, self._COUNTER_OFFSET)
+            struct.pack_into("<i", buf, self._COUNTER_OFFSET, counter + 1)
+
+    def reset_counter(self):
+        with self._locked() as buf:
+            struct.pack_into("<i", buf, self._COUNTER_OFFSET, 0)
+
+    @property
+    def counter(self) -> int:
+        (counter,) = struct.unpack_from("<i", self._buffer(), self._COUNTER_OFFSET)
+        return counter
+
+    @property
+    def opened_at(self) -> datetime | None:
+        (timestamp,) = struct.unpack_from("<d", self._buffer(), self._OPENED_AT_OFFSET)
+        if not timestamp:
+            return None
+        # pybreaker compara contra datetime.utcnow() (naive en UTC)
+        return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+    @opened_at.setter
+    def opened_at(self, now: datetime):
+        timestamp = now.replace(tzinfo=timezone.utc).timestamp()
+        with self._locked() as buf:
+            struct.pack_into("<d", buf, self._OPENED_AT_OFFSET, timestamp)
+
+
+# -------------------------
+# Factory según CB_STATE_STORE
+# -------------------------
+def build_state_storage(
+    backend: str,
+    namespace: str,
+    shm_dir: str = "/dev/shm",
+    valkey_host: str = "valkey",
+    valkey_port: int = 6379,
+    valkey_timeout_sec: float = 0.2,
+) -> pybreaker.CircuitBreakerStorage:
+    """
+    memory: estado por proceso (comportamiento original de pybreaker)
+    shm:    compartido entre workers del mismo host (mmap en /dev/shm)
+    valkey: compartido entre réplicas del gateway (CircuitRedisStorage de pybreaker)
+    """
+    if backend == "memory":
+        return pybreaker.CircuitMemoryStorage(pybreaker.STATE_CLOSED)
+
+    if backend == "shm":
+        return CircuitSharedMemoryStorage(pybreaker.STATE_CLOSED, namespace, shm_dir)
+
+    if backend == "valkey":
+        import redis
+
+        client = redis.Redis(
+            host=valkey_host,
+            port=valkey_port,
+            socket_timeout=valkey_timeout_sec,
+            socket_connect_timeout=valkey_timeout_sec
+        )
+        # En runtime, si Valkey no responde pybreaker cae a fallback_circuit_state (closed);
+        # al arrancar (setnx inicial) se degrada a estado por proceso en vez de tumbar el worker.
+        try:
+            return pybreaker.CircuitRedisStorage(pybreaker.STATE_CLOSED, client, namespace=namespace)
+        except redis.RedisError as e:
+            logger.warning(f"[CB] Valkey no disponible para '{namespace}', usando memory: {e}")
+            return pybreaker.CircuitMemoryStorage(pybreaker.STATE_CLOSED)
+
+    raise ValueError(f"CB_STATE_STORE desconocido: {backend} (usar memory|shm|valkey)")
+
+
+def storage_view(storage: pybreaker.CircuitBreakerStorage) -> dict:
+    """
+    Vista del estado tal como la ve el storage (cluster-wide si es shm/valkey).
+    """
+    opened_at = storage.opened_at
+    return {
+        "state": storage.state,
+        "fail_counter": storage.counter,
+        "opened_at": opened_at.isoformat() + "Z" if opened_at else None
+    }
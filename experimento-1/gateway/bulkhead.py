@@ -0,0 +1,95 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class BulkheadFullError(Exception):
+    pass
+
+
+class AdaptiveBulkhead:
+    """
+    Limita los requests concurrentes de ESTE worker hacia un upstream, con un
+    límite que se adapta por AIMD según la latencia observada:
+      - additive increase: +1/limit por llamada rápida y sin error, solo si el
+        límite se está usando (in_flight >= limit/2); ~+1 por "ronda" completa
+      - multiplicative decrease: limit *= backoff_ratio ante error/timeout o
+        latencia > latency_target_sec
+    Lo que excede el límite se rechaza de inmediato (BulkheadFullError -> 503),
+    así un upstream lento no acapara todos los threads del worker.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        latency_target_sec: float,
+        backoff_ratio: float = 0.9,
+        ignored_exceptions: tuple = (),
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target_sec = latency_target_sec
+        self.backoff_ratio = backoff_ratio
+        self.ignored_exceptions = ignored_exceptions
+
+        self._lock = threading.Lock()
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.in_flight = 0
+        self.accepted = 0
+        self.rejected = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self):
+        with self._lock:
+            if self.in_flight >= int(self._limit):
+                self.rejected += 1
+                raise BulkheadFullError(f"Bulkhead '{self.name}' full ({self.in_flight}/{int(self._limit)})")
+            self.in_flight += 1
+            self.accepted += 1
+
+    def release(self, latency_sec: float | None, dropped: bool = False):
+        """
+        latency_sec=None libera el slot sin aportar muestra (p.ej. breaker OPEN).
+        """
+        with self._lock:
+            saturated = self.in_flight * 2 >= self._limit
+            self.in_flight -= 1
+            if latency_sec is None:
+                return
+            if dropped or latency_sec > self.latency_target_sec:
+                self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+            elif saturated:
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        started = time.perf_counter()
+        try:
+            yield
+        except self.ignored_exceptions:
+            self.release(None)
+            raise
+        except BaseException:
+            self.release(time.perf_counter() - started, dropped=True)
+            raise
+        self.release(time.perf_counter() - started)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "limit": int(self._limit),
+                "min_limit": self.min_limit,
+                "max_limit": self.max_limit,
+                "latency_target_sec": self.latency_target_sec,
+                "in_flight": self.in_flight,
+                "accepted": self.accepted,
+                "rejected": self.rejected
+            }
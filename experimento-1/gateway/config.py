@@ -0,0 +1,84 @@
+import os
+
+# -------------------------
+# Config (env vars)
+# -------------------------
+UPSTREAM_API_BASE = os.getenv("UPSTREAM_API_BASE", "http://api:5000")
+PAYMENT_BASE = os.getenv("PAYMENT_BASE", "http://payment-mock:8080")
+
+# Timeout del request al upstream (corto para fail-fast)
+UPSTREAM_TIMEOUT_SEC = float(os.getenv("UPSTREAM_TIMEOUT_SEC", "1.5"))
+
+# Circuit breaker parameters
+CB_FAIL_MAX = int(os.getenv("CB_FAIL_MAX", "5"))              # fallos para abrir
+CB_RESET_TIMEOUT = int(os.getenv("CB_RESET_TIMEOUT", "15"))   # segundos abierto antes de half-open
+
+# Modo del breaker: consecutive (pybreaker, CB_FAIL_MAX fallos seguidos) | window (tasa de fallos/lentitud)
+CB_MODE = os.getenv("CB_MODE", "consecutive").lower()
+CB_WINDOW_TYPE = os.getenv("CB_WINDOW_TYPE", "count").lower()                  # count | time
+CB_WINDOW_SIZE = int(os.getenv("CB_WINDOW_SIZE", "50"))                        # llamadas o segundos
+CB_MIN_CALLS = int(os.getenv("CB_MIN_CALLS", "10"))                            # mínimo para evaluar tasas
+CB_FAILURE_RATE_THRESHOLD = float(os.getenv("CB_FAILURE_RATE_THRESHOLD", "50"))      # %
+CB_SLOW_CALL_RATE_THRESHOLD = float(os.getenv("CB_SLOW_CALL_RATE_THRESHOLD", "50"))  # %
+CB_SLOW_CALL_DURATION_SEC = float(os.getenv("CB_SLOW_CALL_DURATION_SEC", "1.0"))
+CB_HALF_OPEN_PERMITTED_CALLS = int(os.getenv("CB_HALF_OPEN_PERMITTED_CALLS", "3"))
+
+# Dónde vive el estado del breaker: memory (por proceso) | shm (workers del host) | valkey (réplicas)
+CB_STATE_STORE = os.getenv("CB_STATE_STORE", "memory").lower()
+CB_SHM_DIR = os.getenv("CB_SHM_DIR", "/dev/shm")
+VALKEY_HOST = os.getenv("VALKEY_HOST", "valkey")
+VALKEY_PORT = int(os.getenv("VALKEY_PORT", "6379"))
+
+# Bulkhead adaptativo (AIMD) por upstream y por worker
+BULKHEAD_INITIAL_LIMIT = int(os.getenv("BULKHEAD_INITIAL_LIMIT", "4"))
+BULKHEAD_MIN_LIMIT = int(os.getenv("BULKHEAD_MIN_LIMIT", "1"))
+BULKHEAD_MAX_LIMIT = int(os.getenv("BULKHEAD_MAX_LIMIT", "16"))
+BULKHEAD_LATENCY_TARGET_SEC = float(os.getenv("BULKHEAD_LATENCY_TARGET_SEC", "0.5"))  # más lento -> baja el límite
+BULKHEAD_BACKOFF_RATIO = float(os.getenv("BULKHEAD_BACKOFF_RATIO", "0.9"))
+
+# Pool keep-alive por upstream (uno por worker)
+UPSTREAM_POOL_MAXSIZE = int(os.getenv("UPSTREAM_POOL_MAXSIZE", "20"))            # conexiones por host
+UPSTREAM_POOL_BLOCK = os.getenv("UPSTREAM_POOL_BLOCK", "false").lower() == "true"  # límite duro por host
+UPSTREAM_POOL_MAX_IDLE_SEC = float(os.getenv("UPSTREAM_POOL_MAX_IDLE_SEC", "30"))
+
+# Cache de respuestas para GET /api/items (LRU por worker, stale-while-revalidate / stale-if-error)
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_TTL_SEC = float(os.getenv("CACHE_TTL_SEC", "5"))
+CACHE_STALE_WHILE_REVALIDATE_SEC = float(os.getenv("CACHE_STALE_WHILE_REVALIDATE_SEC", "30"))
+CACHE_STALE_IF_ERROR_SEC = float(os.getenv("CACHE_STALE_IF_ERROR_SEC", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "256"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+CACHE_MAX_ENTRY_BYTES = int(os.getenv("CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+
+# Single-flight: GETs idénticos concurrentes comparten una llamada al upstream
+SINGLEFLIGHT_ENABLED = os.getenv("SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+SINGLEFLIGHT_MAX_WAITERS = int(os.getenv("SINGLEFLIGHT_MAX_WAITERS", "100"))
+SINGLEFLIGHT_MAX_BODY_BYTES = int(os.getenv("SINGLEFLIGHT_MAX_BODY_BYTES", str(1024 * 1024)))  # más grande -> stream
+
+# Hedging de GETs idempotentes + retry budget (los intentos extra nunca superan RETRY_BUDGET_RATIO de la carga)
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))          # antes de esto no se hedgea
+HEDGE_MIN_DELAY_SEC = float(os.getenv("HEDGE_MIN_DELAY_SEC", "0.05"))
+HEDGE_POOL_SIZE = int(os.getenv("HEDGE_POOL_SIZE", "16"))
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.1"))
+RETRY_BUDGET_MAX_TOKENS = float(os.getenv("RETRY_BUDGET_MAX_TOKENS", "10"))
+
+# Logging: cola acotada + writer en background (LOG_ASYNC), líneas JSON, muestreo de logs INFO
+LOG_LEVEL = os.getenv("LOG_LEVEL", "WARNING")
+LOG_ASYNC = os.getenv("LOG_ASYNC", "true").lower() == "true"
+LOG_JSON = os.getenv("LOG_JSON", "true").lower() == "true"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SUCCESS_SAMPLE_EVERY = int(os.getenv("LOG_SUCCESS_SAMPLE_EVERY", "1"))   # 1 = todos
+
+# Streaming del body del upstream (los cuerpos chicos se siguen bufferizando)
+PROXY_STREAMING = os.getenv("PROXY_STREAMING", "true").lower() == "true"
+PROXY_STREAM_THRESHOLD_BYTES = int(os.getenv("PROXY_STREAM_THRESHOLD_BYTES", "65536"))
+PROXY_STREAM_CHUNK_SIZE = int(os.getenv("PROXY_STREAM_CHUNK_SIZE", "16384"))
+
+# Motor de serving: "sync" (Flask + gunicorn threads) o "async" (Quart + uvicorn, asyncio).
+# async no tiene cache, single-flight, bulkhead, hedging ni breaker window/compartido (ver serve.py)
+GATEWAY_ENGINE = os.getenv("GATEWAY_ENGINE", "sync").lower()
+GATEWAY_PORT = int(os.getenv("GATEWAY_PORT", "7000"))
+GATEWAY_WORKERS = int(os.getenv("GATEWAY_WORKERS", "2"))
+GATEWAY_THREADS = int(os.getenv("GATEWAY_THREADS", "4"))
@@ -0,0 +1,6 @@
+from prometheus_client import multiprocess
+
+
+def child_exit(server, worker):
+    # Libera los gauges "live" del worker que murió (métricas multiproceso)
+    multiprocess.mark_process_dead(worker.pid)
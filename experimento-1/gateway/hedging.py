@@ -0,0 +1,189 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class LatencyTracker:
+    """
+    Últimas `size` latencias exitosas en un ring buffer. El percentil se
+    recalcula cada `refresh_every` muestras (no en cada request).
+    """
+
+    def __init__(self, percentile: float, size: int = 512, min_samples: int = 20, refresh_every: int = 32):
+        self.percentile = percentile
+        self.size = size
+        self.min_samples = min_samples
+        self.refresh_every = refresh_every
+
+        self._lock = threading.Lock()
+        self._ring = [0.0] * size
+        self._pos = 0
+        self._count = 0
+        self._since_refresh = 0
+        self._cached = None
+
+    def observe(self, latency_sec: float):
+        with self._lock:
+            self._ring[self._pos] = latency_sec
+            self._pos = (self._pos + 1) % self.size
+            self._count = min(self._count + 1, self.size)
+            self._since_refresh += 1
+            if self._count >= self.min_samples and (self._cached is None or self._since_refresh >= self.refresh_every):
+                samples = sorted(self._ring[:self._count])
+                index = min(int(len(samples) * self.percentile / 100), len(samples) - 1)
+                self._cached = samples[index]
+                self._since_refresh = 0
+
+    def quantile(self) -> float | None:
+        return self._cached
+
+
+class RetryBudget:
+    """
+    Token bucket: cada request original deposita `ratio` tokens (hasta
+    `max_tokens`) y cada intento extra (hedge o retry) consume 1. Así los
+    intentos extra nunca superan ~ratio*100 % de la carga original.
+    """
+
+    def __init__(self, ratio: float, max_tokens: float):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._lock = threading.Lock()
+        self._tokens = 0.0
+        self.withdrawn = 0
+        self.exhausted = 0
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                self.withdrawn += 1
+                return True
+            self.exhausted += 1
+            return False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "ratio": self.ratio,
+                "max_tokens": self.max_tokens,
+                "tokens": round(self._tokens, 3),
+                "withdrawn": self.withdrawn,
+                "exhausted": self.exhausted
+            }
+
+
+class Hedger:
+    """
+    Hedged requests para llamadas idempotentes:
+      1. lanza el intento original
+      2. si no respondió tras el percentil observado (p95 por defecto), lanza
+         un segundo intento si el RetryBudget lo permite
+      3. se queda con la primera respuesta exitosa; la perdedora se cancela si
+         no arrancó o se cierra al terminar (libera la conexión del pool)
+    Si el intento falla rápido con un error reintentable y no hay otro en
+    vuelo, se reintenta una vez (también contra el budget).
+
+    Todo ocurre dentro de UNA llamada al breaker: el breaker ve un resultado
+    por request lógico, no uno por intento.
+    """
+
+    def __init__(
+        self,
+        tracker: LatencyTracker,
+        budget: RetryBudget,
+        min_delay_sec: float,
+        max_delay_sec: float,
+        pool_size: int,
+        retryable=lambda exc: False,
+        discard=lambda result: None,
+        on_event=lambda event: None,
+    ):
+        self.tracker = tracker
+        self.budget = budget
+        self.min_delay_sec = min_delay_sec
+        self.max_delay_sec = max_delay_sec
+        self.retryable = retryable
+        self.discard = discard
+        self.on_event = on_event
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="hedge")
+
+    def _timed(self, fn):
+        started = time.perf_counter()
+        result = fn()
+        self.tracker.observe(time.perf_counter() - started)
+        return result
+
+    def _extra_attempt(self, kind: str) -> bool:
+        if not self.budget.try_withdraw():
+            self.on_event("budget_exhausted")
+            return False
+        self.on_event(f"{kind}_sent")
+        return True
+
+    def _discard_later(self, future):
+        if future.cancel():
+            return
+
+        def _close(f):
+            if f.exception() is None:
+                self.discard(f.result())
+
+        future.add_done_callback(_close)
+
+    def delay(self) -> float | None:
+        quantile = self.tracker.quantile()
+        if quantile is None:
+            return None
+        return min(max(quantile, self.min_delay_sec), self.max_delay_sec)
+
+    def call(self, fn, hedge: bool = True):
+        self.budget.deposit()
+        delay = self.delay() if hedge else None
+
+        if delay is None:
+            # Sin muestras suficientes (o breaker no CLOSED): intento directo, a lo sumo un retry
+            try:
+                return self._timed(fn)
+            except Exception as exc:
+                if hedge and self.retryable(exc) and self._extra_attempt("retry"):
+                    return self._timed(fn)
+                raise
+
+        primary = self._executor.submit(self._timed, fn)
+        attempts = [primary]
+        done, _ = wait(attempts, timeout=delay)
+        if not done and self._extra_attempt("hedge"):
+            attempts.append(self._executor.submit(self._timed, fn))
+
+        pending = set(attempts)
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        self._discard_later(loser)
+                    if future is not primary:
+                        self.on_event("hedge_won")
+                    return future.result()
+                last_error = future.exception()
+
+            if not pending and len(attempts) < 2 and self.retryable(last_error) and self._extra_attempt("retry"):
+                retry = self._executor.submit(self._timed, fn)
+                attempts.append(retry)
+                pending.add(retry)
+
+        raise last_error
+
+    def snapshot(self) -> dict:
+        delay = self.delay()
+        return {
+            "current_delay_sec": round(delay, 4) if delay is not None else None,
+            "percentile": self.tracker.percentile,
+            "budget": self.budget.snapshot()
+        }
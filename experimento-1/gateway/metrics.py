@@ -0,0 +1,141 @@
+"""
+Métricas Prometheus del gateway (GET /metrics).
+
+Con gunicorn cada worker es un proceso distinto: si PROMETHEUS_MULTIPROC_DIR
+está definido (ver serve.py / gunicorn.conf.py), prometheus_client escribe
+los valores en archivos mmap por pid y /metrics los agrega entre todos los
+workers. Sin esa variable (p.ej. `flask run` local) se usa el registry normal.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+import httpx
+import requests
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Buckets pensados para UPSTREAM_TIMEOUT_SEC=1.5 y el toxic de latencia de 2s
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 2.5, 5.0)
+
+BREAKER_STATE_VALUES = {"closed": 0, "half-open": 1, "open": 2}
+
+REQUESTS = Counter(
+    "gateway_requests_total",
+    "Requests atendidos por el gateway",
+    ["route", "method", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "gateway_request_duration_seconds",
+    "Latencia de punta a punta por ruta (hasta headers de respuesta)",
+    ["route"],
+    buckets=LATENCY_BUCKETS
+)
+UPSTREAM_CALLS = Counter(
+    "gateway_upstream_requests_total",
+    "Llamadas a upstream por resultado (ok|timeout|error|rejected_breaker|rejected_bulkhead)",
+    ["upstream", "outcome"]
+)
+UPSTREAM_LATENCY = Histogram(
+    "gateway_upstream_duration_seconds",
+    "Latencia de las llamadas que sí salieron hacia el upstream",
+    ["upstream"],
+    buckets=LATENCY_BUCKETS
+)
+BREAKER_TRANSITIONS = Counter(
+    "gateway_breaker_transitions_total",
+    "Transiciones de estado observadas por los breakers",
+    ["breaker", "from_state", "to_state"]
+)
+BREAKER_STATE = Gauge(
+    "gateway_breaker_state",
+    "Último estado observado del breaker (0=closed, 1=half-open, 2=open)",
+    ["breaker"],
+    multiprocess_mode="mostrecent"
+)
+CACHE_LOOKUPS = Counter(
+    "gateway_cache_lookups_total",
+    "Resultado de las consultas al cache de respuestas (hit|stale|miss|stale_if_error)",
+    ["result"]
+)
+SINGLEFLIGHT = Counter(
+    "gateway_singleflight_requests_total",
+    "GETs por rol en el single-flight (leader|follower|overflow); collapse = follower / total",
+    ["role"]
+)
+LOG_DROPPED = Counter(
+    "gateway_log_records_dropped_total",
+    "Logs descartados porque la cola del writer async estaba llena"
+)
+HEDGING = Counter(
+    "gateway_hedging_events_total",
+    "Intentos extra a upstream (hedge_sent|retry_sent|hedge_won|budget_exhausted)",
+    ["event"]
+)
+
+
+@contextmanager
+def upstream_timer(upstream: str):
+    """
+    Envuelve la llamada HTTP real (dentro del breaker): mide latencia y clasifica el resultado.
+    Sirve a los dos motores (requests en app.py, httpx en asgi_app.py).
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except (requests.Timeout, httpx.TimeoutException):
+        UPSTREAM_CALLS.labels(upstream, "timeout").inc()
+        raise
+    except Exception:
+        UPSTREAM_CALLS.labels(upstream, "error").inc()
+        raise
+    finally:
+        UPSTREAM_LATENCY.labels(upstream).observe(time.perf_counter() - started)
+    UPSTREAM_CALLS.labels(upstream, "ok").inc()
+
+
+def upstream_rejected(upstream: str, reason: str):
+    UPSTREAM_CALLS.labels(upstream, f"rejected_{reason}").inc()
+
+
+def observe_request(route: str, method: str, status: int, elapsed_sec: float):
+    REQUESTS.labels(route, method, str(status)).inc()
+    REQUEST_LATENCY.labels(route).observe(elapsed_sec)
+
+
+def cache_lookup(result: str):
+    CACHE_LOOKUPS.labels(result).inc()
+
+
+def singleflight(role: str):
+    SINGLEFLIGHT.labels(role).inc()
+
+
+def hedging_event(event: str):
+    HEDGING.labels(event).inc()
+
+
+def log_dropped():
+    LOG_DROPPED.inc()
+
+
+def breaker_transition(breaker: str, old_state: str, new_state: str):
+    BREAKER_TRANSITIONS.labels(breaker, old_state, new_state).inc()
+    BREAKER_STATE.labels(breaker).set(BREAKER_STATE_VALUES.get(new_state, -1))
+
+
+def render() -> tuple[bytes, str]:
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
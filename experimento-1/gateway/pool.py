@@ -0,0 +1,132 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+# -------------------------
+# Contadores del pool (hit = conexión keep-alive reutilizada, miss = handshake TCP nuevo)
+# -------------------------
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.idle_evictions = 0
+
+    def record(self, reused: bool, evicted: bool = False):
+        with self._lock:
+            if reused:
+                self.hits += 1
+            else:
+                self.misses += 1
+            if evicted:
+                self.idle_evictions += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "idle_evictions": self.idle_evictions,
+                "hit_ratio": round(self.hits / total, 4) if total else None
+            }
+
+
+class _TrackedPoolMixin:
+    """
+    Extiende el pool de urllib3 para:
+      - contar hits/misses (una conexión con socket abierto es un hit)
+      - cerrar conexiones que llevan más de max_idle_sec sin usarse
+    """
+    stats: PoolStats = None
+    max_idle_sec: float = 0.0
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        evicted = False
+
+        idle_since = getattr(conn, "_idle_since", None)
+        if (
+            self.max_idle_sec > 0
+            and conn.sock is not None
+            and idle_since is not None
+            and time.monotonic() - idle_since > self.max_idle_sec
+        ):
+            # Conexión ociosa demasiado tiempo: probablemente el upstream ya la cerró
+            conn.close()
+            evicted = True
+
+        self.stats.record(reused=conn.sock is not None, evicted=evicted)
+        return conn
+
+    def _put_conn(self, conn):
+        if conn is not None:
+            conn._idle_since = time.monotonic()
+        super()._put_conn(conn)
+
+
+class TrackedHTTPAdapter(HTTPAdapter):
+    def __init__(self, stats: PoolStats, max_idle_sec: float, **kwargs):
+        self.stats = stats
+        self.max_idle_sec = max_idle_sec
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        attrs = {"stats": self.stats, "max_idle_sec": self.max_idle_sec}
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": type("TrackedHTTPConnectionPool", (_TrackedPoolMixin, HTTPConnectionPool), attrs),
+            "https": type("TrackedHTTPSConnectionPool", (_TrackedPoolMixin, HTTPSConnectionPool), attrs),
+        }
+
+
+# -------------------------
+# Pool por upstream
+# -------------------------
+class UpstreamPool:
+    """
+    Sesión HTTP keep-alive dedicada a un upstream.
+
+    Se instancia al importar app.py; como gunicorn hace fork de los workers
+    antes de importar la app (sin --preload), cada worker tiene su propio pool.
+      - maxsize:      conexiones keep-alive que se conservan por host
+      - block:        si es True, maxsize es un límite duro por host (espera en vez de abrir más)
+      - max_idle_sec: conexiones ociosas más tiempo que esto se descartan antes de reutilizarse
+    """
+
+    def __init__(self, name: str, maxsize: int, block: bool, max_idle_sec: float, host_pools: int = 1):
+        self.name = name
+        self.maxsize = maxsize
+        self.block = block
+        self.max_idle_sec = max_idle_sec
+        self.stats = PoolStats()
+
+        adapter = TrackedHTTPAdapter(
+            stats=self.stats,
+            max_idle_sec=max_idle_sec,
+            pool_connections=host_pools,
+            pool_maxsize=maxsize,
+            pool_block=block,
+            max_retries=0
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.session.get(url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.session.post(url, **kwargs)
+
+    def state(self) -> dict:
+        return {
+            "maxsize_per_host": self.maxsize,
+            "block": self.block,
+            "max_idle_sec": self.max_idle_sec,
+            **self.stats.snapshot()
+        }
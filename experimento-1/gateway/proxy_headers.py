@@ -0,0 +1,27 @@
+"""
+Headers de la respuesta del upstream, compartido por los dos motores
+(app.py con requests, asgi_app.py con httpx): ambos exponen `headers`
+como mapping case-insensitive.
+"""
+
+HOP_BY_HOP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+def forward_headers(headers) -> list:
+    return [
+        (name, value)
+        for name, value in headers.items()
+        if name.lower() not in HOP_BY_HOP_HEADERS
+    ]
+
+
+def content_length(headers) -> int | None:
+    """
+    Content-Length del upstream como int; None si falta o no es un entero
+    válido (se trata como largo desconocido: se streamea).
+    """
+    try:
+        length = int(headers["Content-Length"])
+    except (KeyError, ValueError):
+        return None
+    return length if length >= 0 else None
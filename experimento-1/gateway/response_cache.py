@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class CachedResponse:
+    def __init__(self, status: int, headers: list, content_type: str, body: bytes, stored_at: float):
+        self.status = status
+        self.headers = headers
+        self.content_type = content_type
+        self.body = body
+        self.stored_at = stored_at
+
+    def age(self) -> int:
+        return int(time.monotonic() - self.stored_at)
+
+
+class ResponseCache:
+    """
+    Cache LRU en memoria (por worker) para respuestas de GETs idempotentes.
+
+    Cada entrada pasa por tres ventanas desde que se guardó:
+      - fresh:  age < ttl_sec                              -> HIT, sin tocar upstream
+      - stale:  age < ttl_sec + stale_while_revalidate_sec -> STALE + revalidación en background
+      - error:  age < ttl_sec + stale_if_error_sec         -> solo si el upstream falla / breaker OPEN
+    Acotado por cantidad de entradas y por bytes totales de body.
+    """
+
+    FRESH = "fresh"
+    STALE = "stale"
+
+    def __init__(
+        self,
+        ttl_sec: float,
+        stale_while_revalidate_sec: float,
+        stale_if_error_sec: float,
+        max_entries: int,
+        max_bytes: int,
+        max_entry_bytes: int,
+    ):
+        self.ttl_sec = ttl_sec
+        self.stale_while_revalidate_sec = stale_while_revalidate_sec
+        self.stale_if_error_sec = stale_if_error_sec
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._bytes = 0
+        self._revalidating: set[str] = set()
+
+    def _get(self, key: str, max_age: float) -> CachedResponse | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry.stored_at >= max_age:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def lookup(self, key: str) -> tuple[CachedResponse | None, str | None]:
+        """
+        Devuelve (entrada, FRESH|STALE) o (None, None) si hay que ir al upstream.
+        """
+        entry = self._get(key, self.ttl_sec + self.stale_while_revalidate_sec)
+        if entry is None:
+            return None, None
+        if time.monotonic() - entry.stored_at < self.ttl_sec:
+            return entry, self.FRESH
+        return entry, self.STALE
+
+    def lookup_stale_if_error(self, key: str) -> CachedResponse | None:
+        return self._get(key, self.ttl_sec + self.stale_if_error_sec)
+
+    def fits(self, content_length: int | None) -> bool:
+        return content_length is not None and content_length <= self.max_entry_bytes
+
+    def store(self, key: str, entry: CachedResponse) -> CachedResponse:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous.body)
+            self._entries[key] = entry
+            self._bytes += len(entry.body)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+        return entry
+
+    def revalidate_async(self, key: str, refresh) -> bool:
+        """
+        Lanza refresh() en un thread daemon, como máximo una revalidación por key a la vez.
+        """
+        with self._lock:
+            if key in self._revalidating:
+                return False
+            self._revalidating.add(key)
+
+        def _run():
+            try:
+                refresh()
+            except Exception:
+                # El próximo request volverá a intentar; mientras tanto se sigue sirviendo STALE
+                pass
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        threading.Thread(target=_run, name=f"revalidate:{key}", daemon=True).start()
+        return True
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_sec": self.ttl_sec,
+                "stale_while_revalidate_sec": self.stale_while_revalidate_sec,
+                "stale_if_error_sec": self.stale_if_error_sec,
+                "revalidating": len(self._revalidating)
+            }
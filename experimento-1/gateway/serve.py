@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+import os
+import shutil
+import sys
+
+from config import (
+    GATEWAY_ENGINE,
+    GATEWAY_PORT,
+    GATEWAY_WORKERS,
+    GATEWAY_THREADS,
+    CB_MODE,
+    CB_STATE_STORE,
+    CACHE_ENABLED,
+    SINGLEFLIGHT_ENABLED,
+    HEDGE_ENABLED,
+)
+
+
+def reset_metrics_dir():
+    """
+    prometheus_client en modo multiproceso guarda un archivo por pid; se parte
+    de un directorio vacío en cada arranque para no arrastrar workers viejos.
+    """
+    metrics_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if not metrics_dir:
+        return
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def check_async_engine() -> bool:
+    """
+    El motor async (asgi_app.py) solo tiene el breaker consecutivo en memoria:
+    con CB_MODE=window o estado compartido no arranca (el experimento mediría
+    otra cosa); cache, single-flight, hedging y bulkhead solo se avisan.
+    """
+    unsupported = []
+    if CB_MODE != "consecutive":
+        unsupported.append(f"CB_MODE={CB_MODE}")
+    if CB_STATE_STORE != "memory":
+        unsupported.append(f"CB_STATE_STORE={CB_STATE_STORE}")
+    if unsupported:
+        print(f"GATEWAY_ENGINE=async no soporta {', '.join(unsupported)} (usar GATEWAY_ENGINE=sync)")
+        return False
+
+    ignored = ["bulkhead"]
+    if CACHE_ENABLED:
+        ignored.append("CACHE_ENABLED")
+    if SINGLEFLIGHT_ENABLED:
+        ignored.append("SINGLEFLIGHT_ENABLED")
+    if HEDGE_ENABLED:
+        ignored.append("HEDGE_ENABLED")
+    print(f"WARNING: GATEWAY_ENGINE=async ignora {', '.join(ignored)} (solo en GATEWAY_ENGINE=sync)")
+    return True
+
+
+def main():
+    reset_metrics_dir()
+    bind = f"0.0.0.0:{GATEWAY_PORT}"
+
+    if GATEWAY_ENGINE == "async":
+        if not check_async_engine():
+            return 1
+        # Un event loop por worker; los requests en vuelo no consumen threads
+        args = [
+            "uvicorn",
+            "asgi_app:app",
+            "--host", "0.0.0.0",
+            "--port", str(GATEWAY_PORT),
+            "--workers", str(GATEWAY_WORKERS),
+        ]
+    elif GATEWAY_ENGINE == "sync":
+        args = [
+            "gunicorn",
+            "-c", "gunicorn.conf.py",
+            "-b", bind,
+            "--workers", str(GATEWAY_WORKERS),
+            "--threads", str(GATEWAY_THREADS),
+            "app:app",
+        ]
+    else:
+        print(f"GATEWAY_ENGINE desconocido: {GATEWAY_ENGINE} (usar sync|async)")
+        return 1
+
+    print("Starting gateway:", " ".join(args))
+    os.execvp(args[0], args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+import threading
+
+LEADER = "leader"
+FOLLOWER = "follower"
+OVERFLOW = "overflow"
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Deduplica llamadas concurrentes con la misma key (patrón "single-flight"):
+    el primer request (leader) ejecuta fn(); los que llegan mientras tanto
+    (followers) esperan y reciben el mismo resultado o la misma excepción.
+    Pasado max_waiters, los requests extra ejecutan su propia llamada en vez
+    de encolarse detrás del leader.
+    """
+
+    def __init__(self, max_waiters: int):
+        self.max_waiters = max_waiters
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+        self.leaders = 0
+        self.followers = 0
+        self.overflow = 0
+
+    def do(self, key: str, fn):
+        """
+        Devuelve (resultado, rol): LEADER u OVERFLOW si ESTE caller ejecutó fn(),
+        FOLLOWER si recibió el resultado de otro.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+                role = LEADER
+            elif call.waiters >= self.max_waiters:
+                self.overflow += 1
+                role = OVERFLOW
+            else:
+                call.waiters += 1
+                self.followers += 1
+                role = FOLLOWER
+
+        if role == OVERFLOW:
+            return fn(), OVERFLOW
+
+        if role == FOLLOWER:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, FOLLOWER
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, LEADER
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = self.leaders + self.followers + self.overflow
+            return {
+                "leaders": self.leaders,
+                "followers": self.followers,
+                "overflow": self.overflow,
+                "in_flight_keys": len(self._calls),
+                "max_waiters": self.max_waiters,
+                "collapse_ratio": round(self.followers / total, 4) if total else None
+            }
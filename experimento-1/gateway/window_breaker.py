@@ -0,0 +1,283 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pybreaker
+
+_SUCCESS = 0
+_FAILURE = 1
+_SLOW = 2
+_SLOW_FAILURE = _FAILURE | _SLOW
+
+
+# -------------------------
+# Ventanas deslizantes (O(1) por llamada)
+# -------------------------
+class CountWindow:
+    """
+    Últimas `size` llamadas en un ring buffer. Los totales se mantienen
+    incrementalmente: al sobrescribir un slot se resta su resultado anterior.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.reset()
+
+    def reset(self):
+        self._ring = [None] * self.size
+        self._pos = 0
+        self.total = 0
+        self.failures = 0
+        self.slow = 0
+
+    def record(self, outcome: int):
+        evicted = self._ring[self._pos]
+        if evicted is not None:
+            self.total -= 1
+            self.failures -= evicted & _FAILURE
+            self.slow -= (evicted & _SLOW) >> 1
+
+        self._ring[self._pos] = outcome
+        self._pos = (self._pos + 1) % self.size
+        self.total += 1
+        self.failures += outcome & _FAILURE
+        self.slow += (outcome & _SLOW) >> 1
+
+    def counts(self) -> tuple[int, int, int]:
+        return self.total, self.failures, self.slow
+
+
+class TimeWindow:
+    """
+    Últimos `size` segundos en un ring de buckets de 1s. Al avanzar el reloj
+    se vacían los buckets vencidos (a lo sumo `size` por salto, amortizado O(1)).
+    """
+
+    def __init__(self, size: int, clock=time.monotonic):
+        self.size = size
+        self._clock = clock
+        self.reset()
+
+    def reset(self):
+        self._buckets = [[0, 0, 0] for _ in range(self.size)]   # total, failures, slow
+        self._current_sec = int(self._clock())
+        self.total = 0
+        self.failures = 0
+        self.slow = 0
+
+    def _advance(self):
+        now_sec = int(self._clock())
+        steps = min(now_sec - self._current_sec, self.size)
+        for offset in range(1, steps + 1):
+            bucket = self._buckets[(self._current_sec + offset) % self.size]
+            self.total -= bucket[0]
+            self.failures -= bucket[1]
+            self.slow -= bucket[2]
+            bucket[0] = bucket[1] = bucket[2] = 0
+        if now_sec > self._current_sec:
+            self._current_sec = now_sec
+
+    def record(self, outcome: int):
+        self._advance()
+        bucket = self._buckets[self._current_sec % self.size]
+        failure = outcome & _FAILURE
+        slow = (outcome & _SLOW) >> 1
+        bucket[0] += 1
+        bucket[1] += failure
+        bucket[2] += slow
+        self.total += 1
+        self.failures += failure
+        self.slow += slow
+
+    def counts(self) -> tuple[int, int, int]:
+        self._advance()
+        return self.total, self.failures, self.slow
+
+
+# -------------------------
+# Breaker por tasa de fallos / llamadas lentas
+# -------------------------
+class SlidingWindowCircuitBreaker:
+    """
+    Alternativa a pybreaker.CircuitBreaker (CB_MODE=window) con la misma
+    interfaz que usan las rutas: call(), current_state, name, listeners y
+    CircuitBreakerError cuando el circuito está abierto.
+
+    Abre cuando, con al menos `min_calls` en la ventana, la tasa de fallos
+    o la tasa de llamadas lentas (>= slow_call_duration_sec, aunque hayan
+    respondido bien) supera su umbral. En HALF-OPEN admite hasta
+    `half_open_permitted_calls` pruebas concurrentes y decide con sus
+    resultados. El lock solo protege la contabilidad, no la llamada al
+    upstream (pybreaker sí serializa call() completo).
+
+    El estado y opened_at viven en un CircuitBreakerStorage de pybreaker,
+    así que CB_STATE_STORE=shm|valkey comparte la decisión de abrir entre
+    workers/réplicas; la ventana de métricas es local a cada proceso.
+    """
+
+    def __init__(
+        self,
+        window,
+        min_calls: int,
+        failure_rate_threshold: float,
+        slow_call_rate_threshold: float,
+        slow_call_duration_sec: float,
+        reset_timeout: float,
+        half_open_permitted_calls: int,
+        state_storage: pybreaker.CircuitBreakerStorage | None = None,
+        listeners=None,
+        name: str | None = None,
+    ):
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.slow_call_duration_sec = slow_call_duration_sec
+        self.reset_timeout = reset_timeout
+        self.half_open_permitted_calls = half_open_permitted_calls
+        self.name = name
+
+        self._storage = state_storage or pybreaker.CircuitMemoryStorage(pybreaker.STATE_CLOSED)
+        self._listeners = list(listeners or [])
+        self._lock = threading.Lock()
+
+        self._last_seen_state = self._storage.state
+        self._probe_window = CountWindow(max(half_open_permitted_calls, 1))
+        self._reset_probes()
+
+    @property
+    def current_state(self) -> str:
+        return self._storage.state
+
+    @property
+    def fail_counter(self) -> int:
+        return self.window.counts()[1]
+
+    # --- transiciones (llamar con self._lock tomado) ---
+    def _sync_state(self) -> str:
+        """
+        Detecta transiciones hechas por otro worker/réplica en el storage compartido.
+        """
+        state = self._storage.state
+        if state != self._last_seen_state:
+            if state == pybreaker.STATE_CLOSED:
+                self.window.reset()
+            if state == pybreaker.STATE_HALF_OPEN:
+                self._reset_probes()
+            self._notify_state_change(self._last_seen_state, state)
+            self._last_seen_state = state
+        return state
+
+    def _transition(self, new_state: str):
+        old_state = self._last_seen_state
+        if new_state == pybreaker.STATE_OPEN:
+            self._storage.opened_at = datetime.utcnow()
+        if new_state == pybreaker.STATE_CLOSED:
+            self.window.reset()
+        if new_state == pybreaker.STATE_HALF_OPEN:
+            self._reset_probes()
+        self._storage.state = new_state
+        self._last_seen_state = new_state
+        self._notify_state_change(old_state, new_state)
+
+    def _notify_state_change(self, old_state: str, new_state: str):
+        for listener in self._listeners:
+            listener.state_change(self, old_state, new_state)
+
+    def _reset_probes(self):
+        self._probes_issued = 0
+        self._probe_window.reset()
+        self._half_open_since = time.monotonic()
+
+    def _rates_exceeded(self, total: int, failures: int, slow: int) -> bool:
+        return (
+            failures * 100 >= self.failure_rate_threshold * total
+            or slow * 100 >= self.slow_call_rate_threshold * total
+        )
+
+    # --- ciclo de una llamada ---
+    def _acquire(self) -> bool:
+        """
+        Devuelve True si la llamada es una prueba de HALF-OPEN.
+        """
+        with self._lock:
+            state = self._sync_state()
+
+            if state == pybreaker.STATE_OPEN:
+                opened_at = self._storage.opened_at
+                if opened_at and datetime.utcnow() < opened_at + timedelta(seconds=self.reset_timeout):
+                    raise pybreaker.CircuitBreakerError("Timeout not elapsed yet, circuit breaker still open")
+                self._transition(pybreaker.STATE_HALF_OPEN)
+                state = pybreaker.STATE_HALF_OPEN
+
+            if state == pybreaker.STATE_HALF_OPEN:
+                if time.monotonic() - self._half_open_since > self.reset_timeout:
+                    # Pruebas que nunca reportaron (worker caído, etc.): se reabre el cupo
+                    self._reset_probes()
+                if self._probes_issued >= self.half_open_permitted_calls:
+                    raise pybreaker.CircuitBreakerError("Circuit breaker half-open, probe calls exhausted")
+                self._probes_issued += 1
+                return True
+
+            return False
+
+    def _record(self, outcome: int, probe: bool) -> bool:
+        """
+        Registra el resultado; devuelve True si esta llamada hizo abrir el circuito.
+        """
+        with self._lock:
+            if probe:
+                if self._last_seen_state != pybreaker.STATE_HALF_OPEN:
+                    return False
+                self._probe_window.record(outcome)
+                total, failures, slow = self._probe_window.counts()
+                if self._rates_exceeded(total, failures, slow):
+                    self._transition(pybreaker.STATE_OPEN)
+                    return True
+                if total >= self.half_open_permitted_calls:
+                    self._transition(pybreaker.STATE_CLOSED)
+                return False
+
+            self.window.record(outcome)
+            if self._last_seen_state != pybreaker.STATE_CLOSED:
+                return False
+            total, failures, slow = self.window.counts()
+            if total >= self.min_calls and self._rates_exceeded(total, failures, slow):
+                self._transition(pybreaker.STATE_OPEN)
+                return True
+            return False
+
+    def call(self, func, *args, **kwargs):
+        probe = self._acquire()
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as exc:
+            slow = time.perf_counter() - started >= self.slow_call_duration_sec
+            for listener in self._listeners:
+                listener.failure(self, exc)
+            if self._record(_SLOW_FAILURE if slow else _FAILURE, probe):
+                raise pybreaker.CircuitBreakerError("Failure rate threshold reached, circuit breaker opened") from exc
+            raise
+
+        slow = time.perf_counter() - started >= self.slow_call_duration_sec
+        # Una respuesta lenta que abre el circuito igual se entrega al cliente
+        self._record(_SLOW if slow else _SUCCESS, probe)
+        for listener in self._listeners:
+            listener.success(self)
+        return result
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total, failures, slow = self.window.counts()
+            return {
+                "window_calls": total,
+                "failure_rate": round(failures * 100 / total, 2) if total else 0.0,
+                "slow_call_rate": round(slow * 100 / total, 2) if total else 0.0,
+                "min_calls": self.min_calls,
+                "failure_rate_threshold": self.failure_rate_threshold,
+                "slow_call_rate_threshold": self.slow_call_rate_threshold,
+                "slow_call_duration_sec": self.slow_call_duration_sec,
+                "half_open_permitted_calls": self.half_open_permitted_calls,
+                "half_open_probes_issued": self._probes_issued
+            }
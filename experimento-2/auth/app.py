@@ -1,16 +1,59 @@
+import json
+import multiprocessing
 import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from datetime import datetime, timedelta, timezone
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 import jwt
+import redis
+
+from keys import SigningKeys, sign_with_kid
 
 app = Flask(__name__)
 
 JWT_SECRET = os.getenv("JWT_SECRET", "super-secret-key")
-JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "RS256")
 JWT_ISSUER = os.getenv("JWT_ISSUER", "auth-service")
 JWT_AUDIENCE = os.getenv("JWT_AUDIENCE", "travelhub-clients")
 JWT_EXP_MINUTES = int(os.getenv("JWT_EXP_MINUTES", "15"))
 
+# Firma asimétrica (RS256 | EdDSA): llaves privadas en JWT_KEYS_DIR, públicas en /.well-known/jwks.json.
+# Con HS256 se sigue usando JWT_SECRET compartido.
+JWT_SYMMETRIC = JWT_ALGORITHM.startswith("HS")
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR", "/app/keys")
+JWT_KEY_ACTIVATION_DELAY_SEC = float(os.getenv("JWT_KEY_ACTIVATION_DELAY_SEC", "600"))
+JWT_KEYS_RELOAD_SEC = float(os.getenv("JWT_KEYS_RELOAD_SEC", "30"))
+JWKS_MAX_AGE_SEC = int(os.getenv("JWKS_MAX_AGE_SEC", "300"))
+
+# Revocación: jti revocados -> stream de Valkey que leen los gateways (push + delta desde el último id)
+VALKEY_HOST = os.getenv("VALKEY_HOST", "valkey")
+VALKEY_PORT = int(os.getenv("VALKEY_PORT", "6379"))
+REVOCATION_STREAM = os.getenv("REVOCATION_STREAM", "auth:revoked")
+REVOCATION_RETENTION_SEC = int(os.getenv("REVOCATION_RETENTION_SEC", "86400"))  # >= vida máxima de un token
+
+# Emisión de tokens en lote (setup de pruebas de carga)
+TOKEN_BATCH_MAX = int(os.getenv("TOKEN_BATCH_MAX", "10000"))
+TOKEN_BATCH_WORKERS = int(os.getenv("TOKEN_BATCH_WORKERS", str(os.cpu_count() or 1)))
+TOKEN_BATCH_CHUNK_SIZE = int(os.getenv("TOKEN_BATCH_CHUNK_SIZE", "50"))
+TOKEN_BATCH_PARALLEL_MIN = int(os.getenv("TOKEN_BATCH_PARALLEL_MIN", "100"))  # por debajo se firma en el request
+
+ROLE_PERMISSIONS = {
+    "admin": ["items:read", "items:write", "admin:all"],
+    "operator": ["items:read", "items:write"],
+    "viewer": ["items:read"]
+}
+
+valkey = redis.Redis(host=VALKEY_HOST, port=VALKEY_PORT, socket_timeout=2, socket_connect_timeout=2)
+
+signing_keys = None if JWT_SYMMETRIC else SigningKeys(
+    keys_dir=JWT_KEYS_DIR,
+    algorithm=JWT_ALGORITHM,
+    activation_delay_sec=JWT_KEY_ACTIVATION_DELAY_SEC,
+    reload_interval_sec=JWT_KEYS_RELOAD_SEC
+)
+
 
 def utc_now() -> datetime:
     return datetime.now(timezone.utc)
@@ -31,6 +74,7 @@ def build_payload(
         "permissions": permissions or [],
         "iat": int(now.timestamp()),
         "exp": int(exp.timestamp()),
+        "jti": uuid.uuid4().hex,
         "iss": JWT_ISSUER,
         "aud": JWT_AUDIENCE
     }
@@ -49,13 +93,56 @@ def build_expired_payload(
         "permissions": permissions or [],
         "iat": int((now - timedelta(minutes=20)).timestamp()),
         "exp": int((now - timedelta(minutes=5)).timestamp()),
+        "jti": uuid.uuid4().hex,
         "iss": JWT_ISSUER,
         "aud": JWT_AUDIENCE
     }
 
 
 def sign_token(payload: dict) -> str:
-    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    if JWT_SYMMETRIC:
+        return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+    kid, private_key, algorithm = signing_keys.active()
+    return jwt.encode(payload, private_key, algorithm=algorithm, headers={"kid": kid})
+
+
+_batch_executor = None
+
+
+def batch_executor() -> ProcessPoolExecutor:
+    """
+    Pool de procesos creado al primer lote grande: la firma RSA/EdDSA es CPU
+    pura y con threads quedaría serializada por el GIL. Se crea desde un
+    worker gunicorn con threads (cliente Valkey, locks de logging y de
+    llaves), así que no se usa fork: los hijos salen del forkserver y cargan
+    la llave de disco (ver keys.sign_with_kid).
+    """
+    global _batch_executor
+    if _batch_executor is None:
+        _batch_executor = ProcessPoolExecutor(
+            max_workers=TOKEN_BATCH_WORKERS,
+            mp_context=multiprocessing.get_context("forkserver")
+        )
+    return _batch_executor
+
+
+def sign_batch(payloads: list[dict]):
+    """
+    Genera (payload, token) en el mismo orden de entrada, chunk a chunk.
+    HMAC es barato: con HS* siempre se firma en el request.
+    """
+    if JWT_SYMMETRIC or len(payloads) < TOKEN_BATCH_PARALLEL_MIN or TOKEN_BATCH_WORKERS <= 1:
+        for payload in payloads:
+            yield payload, sign_token(payload)
+        return
+
+    # Todo el lote con la misma llave activa; el hijo solo recibe el kid
+    kid, _, algorithm = signing_keys.active()
+    sign_chunk = partial(sign_with_kid, keys_dir=JWT_KEYS_DIR, kid=kid, algorithm=algorithm)
+    chunks = [payloads[i:i + TOKEN_BATCH_CHUNK_SIZE] for i in range(0, len(payloads), TOKEN_BATCH_CHUNK_SIZE)]
+    for chunk, tokens in zip(chunks, batch_executor().map(sign_chunk, chunks)):
+        yield from zip(chunk, tokens)
 
 
 @app.get("/health")
@@ -76,7 +163,150 @@ def auth_config():
         "audience": JWT_AUDIENCE,
         "algorithm": JWT_ALGORITHM,
         "default_exp_minutes": JWT_EXP_MINUTES,
-        "supported_roles": ["admin", "operator", "viewer"]
+        "supported_roles": ["admin", "operator", "viewer"],
+        "active_kid": None if JWT_SYMMETRIC else signing_keys.active()[0]
+    }), 200
+
+
+@app.get("/.well-known/jwks.json")
+def jwks():
+    """
+    Llaves públicas vigentes (incluye las recién agregadas que aún no firman).
+    """
+    if JWT_SYMMETRIC:
+        return jsonify({"keys": []}), 200
+
+    response = jsonify(signing_keys.jwks())
+    response.headers["Cache-Control"] = f"public, max-age={JWKS_MAX_AGE_SEC}"
+    return response, 200
+
+
+@app.post("/auth/revoke")
+def revoke_token():
+    """
+    Revoca un token antes de su exp.
+    Body ejemplo: {"token": "<access_token>"}  o  {"jti": "...", "exp": 1700000000}
+    Los gateways dejan de aceptarlo en cuanto leen la entrada del stream.
+    """
+    body = request.get_json(silent=True) or {}
+
+    if body.get("token"):
+        try:
+            # La firma no importa acá: revocar solo puede restringir, y el jti es aleatorio
+            claims = jwt.decode(body["token"], options={"verify_signature": False, "verify_exp": False})
+        except jwt.DecodeError:
+            return jsonify({"error": "token is malformed"}), 400
+        jti, exp = claims.get("jti"), claims.get("exp")
+    else:
+        jti, exp = body.get("jti"), body.get("exp")
+
+    if not jti or exp is None:
+        return jsonify({"error": "jti and exp (or token) are required"}), 400
+    if not isinstance(jti, str):
+        return jsonify({"error": "jti must be a string"}), 400
+    try:
+        exp = int(exp)
+    except (TypeError, ValueError, OverflowError):
+        return jsonify({"error": "exp must be a unix timestamp"}), 400
+
+    now = int(utc_now().timestamp())
+    if exp <= now:
+        return jsonify({"jti": jti, "revoked": False, "reason": "token already expired"}), 200
+
+    # ids del stream = ms de inserción: se recortan entradas más viejas que la retención
+    min_id = f"{(now - REVOCATION_RETENTION_SEC) * 1000}-0"
+    try:
+        entry_id = valkey.xadd(REVOCATION_STREAM, {"jti": jti, "exp": exp}, minid=min_id, approximate=True)
+    except redis.RedisError as e:
+        app.logger.error(f"[AUTH] revocation store error: {str(e)}")
+        return jsonify({"error": "revocation store unavailable"}), 503
+
+    return jsonify({"jti": jti, "revoked": True, "stream_id": entry_id.decode()}), 200
+
+
+@app.post("/auth/tokens:batch")
+def issue_tokens_batch():
+    """
+    Emite muchos tokens en un request (seed de usuarios para JMeter / evidencias).
+    Body ejemplo:
+    {
+      "users": [{"username": "u1", "role": "admin"}, {"username": "u2", "role": "viewer"}],
+      "expires_in_minutes": 60
+    }
+    o bien, N usuarios generados:
+    {"count": 200, "role": "admin", "username_prefix": "load-user"}
+
+    Con `Accept: application/x-ndjson` (o ?format=ndjson) responde una línea JSON
+    por token a medida que se firman, sin armar la respuesta completa en memoria.
+    """
+    body = request.get_json(silent=True) or {}
+    try:
+        expires_in_minutes = int(body.get("expires_in_minutes", JWT_EXP_MINUTES))
+    except (TypeError, ValueError, OverflowError):
+        return jsonify({"error": "expires_in_minutes must be an integer"}), 400
+
+    # El límite se valida antes de armar nada: un count enorme no llega a reservar memoria
+    users = body.get("users")
+    if users is None:
+        try:
+            count = int(body.get("count", 0))
+        except (TypeError, ValueError, OverflowError):
+            return jsonify({"error": "count must be an integer"}), 400
+    elif isinstance(users, list):
+        count = len(users)
+    else:
+        return jsonify({"error": "users (list) or count is required"}), 400
+
+    if count <= 0:
+        return jsonify({"error": "users (list) or count is required"}), 400
+    if count > TOKEN_BATCH_MAX:
+        return jsonify({"error": f"batch too large, max {TOKEN_BATCH_MAX}"}), 400
+
+    if users is None:
+        prefix = body.get("username_prefix", "load-user")
+        users = [{"username": f"{prefix}-{i}", "role": body.get("role", "viewer")} for i in range(1, count + 1)]
+
+    payloads = []
+    for index, user in enumerate(users):
+        role = user.get("role", "viewer") if isinstance(user, dict) else None
+        if not isinstance(user, dict) or not user.get("username") or role not in ROLE_PERMISSIONS:
+            return jsonify({"error": "each user needs a username and a supported role", "index": index}), 400
+
+        try:
+            user_expires_in = int(user.get("expires_in_minutes", expires_in_minutes))
+        except (TypeError, ValueError, OverflowError):
+            return jsonify({"error": "expires_in_minutes must be an integer", "index": index}), 400
+
+        payloads.append(build_payload(
+            username=user["username"],
+            role=role,
+            expires_in_minutes=user_expires_in,
+            permissions=user.get("permissions", ROLE_PERMISSIONS[role])
+        ))
+
+    def entry(payload: dict, token: str) -> dict:
+        return {
+            "username": payload["sub"],
+            "role": payload["role"],
+            "jti": payload["jti"],
+            "exp": payload["exp"],
+            "access_token": token
+        }
+
+    ndjson = request.args.get("format") == "ndjson" or \
+        request.accept_mimetypes.best == "application/x-ndjson"
+
+    if ndjson:
+        def generate():
+            for payload, token in sign_batch(payloads):
+                yield json.dumps(entry(payload, token)) + "\n"
+
+        return Response(generate(), 200, mimetype="application/x-ndjson")
+
+    return jsonify({
+        "count": len(payloads),
+        "token_type": "Bearer",
+        "tokens": [entry(payload, token) for payload, token in sign_batch(payloads)]
     }), 200
 
 
@@ -202,7 +432,8 @@ def tampered_token():
     if len(parts) != 3:
         return jsonify({"error": "Unexpected JWT structure"}), 500
 
-    tampered_signature = parts[2][:-1] + ("A" if parts[2][-1] != "A" else "B")
+    # Se altera el primer carácter: el último puede ser solo bits de relleno base64 (p.ej. en RS256)
+    tampered_signature = ("A" if parts[2][0] != "A" else "B") + parts[2][1:]
     tampered_token = f"{parts[0]}.{parts[1]}.{tampered_signature}"
 
     return jsonify({
@@ -227,20 +458,14 @@ def login():
     if not username:
         return jsonify({"error": "username is required"}), 400
 
-    role_permissions = {
-        "admin": ["items:read", "items:write", "admin:all"],
-        "operator": ["items:read", "items:write"],
-        "viewer": ["items:read"]
-    }
-
-    if role not in role_permissions:
+    if role not in ROLE_PERMISSIONS:
         return jsonify({"error": "unsupported role"}), 400
 
     payload = build_payload(
         username=username,
         role=role,
         expires_in_minutes=JWT_EXP_MINUTES,
-        permissions=role_permissions[role]
+        permissions=ROLE_PERMISSIONS[role]
     )
     token = sign_token(payload)
 
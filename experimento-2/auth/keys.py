@@ -0,0 +1,135 @@
+import fcntl
+import os
+import threading
+import time
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+
+
+def _generate_private_key(algorithm: str):
+    if algorithm == "EdDSA":
+        return ed25519.Ed25519PrivateKey.generate()
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def _algorithm_for(private_key) -> str:
+    if isinstance(private_key, ed25519.Ed25519PrivateKey):
+        return "EdDSA"
+    return "RS256"
+
+
+# Llaves cargadas por un worker del pool de firma en lote (una vez por kid y proceso)
+_worker_keys: dict[str, object] = {}
+
+
+def sign_with_kid(payloads: list[dict], keys_dir: str, kid: str, algorithm: str) -> list[str]:
+    """
+    Firma en un proceso del pool: no hereda estado del worker gunicorn, lee
+    `<kid>.pem` de keys_dir por su cuenta.
+    """
+    private_key = _worker_keys.get(kid)
+    if private_key is None:
+        with open(os.path.join(keys_dir, f"{kid}.pem"), "rb") as f:
+            private_key = serialization.load_pem_private_key(f.read(), password=None)
+        _worker_keys[kid] = private_key
+    return [jwt.encode(payload, private_key, algorithm=algorithm, headers={"kid": kid}) for payload in payloads]
+
+
+class SigningKeys:
+    """
+    Llaves privadas de firma, una por archivo `<kid>.pem` (PKCS8) en keys_dir.
+
+    Rotación sin downtime:
+      1. se agrega una llave nueva al directorio -> se publica en el JWKS de inmediato
+      2. recién cuando tiene más de activation_delay_sec (>= intervalo de refresh
+         del JWKS en los gateways) pasa a ser la llave activa para firmar
+      3. la llave vieja se borra cuando ya expiraron los tokens firmados con ella
+    Si el directorio está vacío al arrancar se genera una llave con `algorithm`.
+    El directorio se relee como máximo cada reload_interval_sec.
+    """
+
+    def __init__(self, keys_dir: str, algorithm: str, activation_delay_sec: float, reload_interval_sec: float):
+        self.keys_dir = keys_dir
+        self.algorithm = algorithm
+        self.activation_delay_sec = activation_delay_sec
+        self.reload_interval_sec = reload_interval_sec
+
+        self._lock = threading.Lock()
+        self._keys: dict[str, tuple[object, str, float]] = {}
+        self._fingerprint = None
+        self._checked_at = 0.0
+
+        os.makedirs(keys_dir, exist_ok=True)
+        self._ensure_key()
+        self._reload()
+
+    def _ensure_key(self):
+        # flock: con varios workers gunicorn solo uno genera la primera llave
+        with open(os.path.join(self.keys_dir, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if any(name.endswith(".pem") for name in os.listdir(self.keys_dir)):
+                return
+            kid = time.strftime("k-%Y%m%dT%H%M%S", time.gmtime())
+            pem = _generate_private_key(self.algorithm).private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption()
+            )
+            path = os.path.join(self.keys_dir, f"{kid}.pem")
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(pem)
+
+    def _reload(self):
+        entries = sorted(
+            (name, os.stat(os.path.join(self.keys_dir, name)).st_mtime)
+            for name in os.listdir(self.keys_dir)
+            if name.endswith(".pem")
+        )
+        fingerprint = tuple(entries)
+        if fingerprint == self._fingerprint:
+            return
+
+        keys = {}
+        for name, mtime in entries:
+            with open(os.path.join(self.keys_dir, name), "rb") as f:
+                private_key = serialization.load_pem_private_key(f.read(), password=None)
+            keys[name[:-len(".pem")]] = (private_key, _algorithm_for(private_key), mtime)
+        self._keys = keys
+        self._fingerprint = fingerprint
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval_sec:
+            return
+        with self._lock:
+            if now - self._checked_at < self.reload_interval_sec:
+                return
+            self._reload()
+            self._checked_at = now
+
+    def active(self) -> tuple[str, object, str]:
+        """
+        (kid, llave privada, algoritmo) para firmar: la llave más nueva que ya
+        cumplió activation_delay_sec; si ninguna la cumple, la más antigua.
+        """
+        self._refresh()
+        keys = self._keys
+        now = time.time()
+        by_age = sorted(keys.items(), key=lambda item: item[1][2])
+        ready = [item for item in by_age if now - item[1][2] >= self.activation_delay_sec]
+        kid, (private_key, algorithm, _) = ready[-1] if ready else by_age[0]
+        return kid, private_key, algorithm
+
+    def jwks(self) -> dict:
+        self._refresh()
+        published = []
+        for kid, (private_key, algorithm, _) in self._keys.items():
+            exporter = OKPAlgorithm if algorithm == "EdDSA" else RSAAlgorithm
+            jwk = exporter.to_jwk(private_key.public_key(), as_dict=True)
+            jwk.update({"kid": kid, "alg": algorithm, "use": "sig"})
+            published.append(jwk)
+        return {"keys": published}
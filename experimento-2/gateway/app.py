@@ -1,10 +1,17 @@
 import os
-from functools import wraps
 
 from flask import Flask, jsonify, request, Response
 import requests
 import jwt
 
+from async_logging import setup_async_logging
+from auth_guard import FailureRateLimiter, LogSampler, RejectedTokenCache, looks_like_jwt
+from jwks import JwksCache, JwksUnavailableError, UnknownKeyError
+from policy import PolicyEngine
+from routes import RouteTable, normalize_path
+from revocation import RevocationList
+from token_cache import VerifiedTokenCache
+
 app = Flask(__name__)
 
 # -------------------------
@@ -13,11 +20,111 @@ app = Flask(__name__)
 UPSTREAM_API_BASE = os.getenv("UPSTREAM_API_BASE", "http://api:5001")
 UPSTREAM_TIMEOUT_SEC = float(os.getenv("UPSTREAM_TIMEOUT_SEC", "3"))
 
+# Streaming del body del upstream (los cuerpos chicos se siguen bufferizando)
+PROXY_STREAMING = os.getenv("PROXY_STREAMING", "true").lower() == "true"
+PROXY_STREAM_THRESHOLD_BYTES = int(os.getenv("PROXY_STREAM_THRESHOLD_BYTES", "65536"))
+PROXY_STREAM_CHUNK_SIZE = int(os.getenv("PROXY_STREAM_CHUNK_SIZE", "16384"))
+
+# Logging: cola acotada + writer en background (LOG_ASYNC), líneas JSON, muestreo de logs INFO
+LOG_LEVEL = os.getenv("LOG_LEVEL", "WARNING")
+LOG_ASYNC = os.getenv("LOG_ASYNC", "true").lower() == "true"
+LOG_JSON = os.getenv("LOG_JSON", "true").lower() == "true"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SUCCESS_SAMPLE_EVERY = int(os.getenv("LOG_SUCCESS_SAMPLE_EVERY", "1"))   # 1 = todos
+
+# Tabla de ruteo (prefix -> upstream, métodos, política); una Session con pool por upstream
+ROUTES_FILE = os.getenv("ROUTES_FILE", "")
+UPSTREAM_POOL_MAXSIZE = int(os.getenv("UPSTREAM_POOL_MAXSIZE", "20"))
+
 JWT_SECRET = os.getenv("JWT_SECRET", "super-secret-key")
-JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "RS256")
 JWT_ISSUER = os.getenv("JWT_ISSUER", "auth-service")
 JWT_AUDIENCE = os.getenv("JWT_AUDIENCE", "travelhub-clients")
 
+# Con RS256/EdDSA las llaves públicas salen del JWKS del auth service (el gateway no conoce ningún secreto)
+JWT_SYMMETRIC = JWT_ALGORITHM.startswith("HS")
+JWKS_URL = os.getenv("JWKS_URL", "http://auth:5002/.well-known/jwks.json")
+JWKS_REFRESH_SEC = float(os.getenv("JWKS_REFRESH_SEC", "300"))
+JWKS_RETRY_SEC = float(os.getenv("JWKS_RETRY_SEC", "2"))
+JWKS_MIN_REFRESH_GAP_SEC = float(os.getenv("JWKS_MIN_REFRESH_GAP_SEC", "10"))
+JWKS_TIMEOUT_SEC = float(os.getenv("JWKS_TIMEOUT_SEC", "2"))
+
+# Cache de tokens ya verificados (por worker); nunca retiene un token más allá de su exp
+JWT_CACHE_ENABLED = os.getenv("JWT_CACHE_ENABLED", "true").lower() == "true"
+JWT_CACHE_MAX_ENTRIES = int(os.getenv("JWT_CACHE_MAX_ENTRIES", "10000"))
+JWT_CACHE_MAX_TTL_SEC = float(os.getenv("JWT_CACHE_MAX_TTL_SEC", "900"))
+
+# Logs del request encolados; el write a stderr lo hace un thread de fondo
+if LOG_ASYNC:
+    async_logging = setup_async_logging(
+        app.logger,
+        level=LOG_LEVEL,
+        json_lines=LOG_JSON,
+        queue_size=LOG_QUEUE_SIZE,
+        success_sample_every=LOG_SUCCESS_SAMPLE_EVERY,
+        module_loggers=("revocation",)
+    )
+else:
+    async_logging = None
+    app.logger.setLevel(LOG_LEVEL)
+
+token_cache = VerifiedTokenCache(max_entries=JWT_CACHE_MAX_ENTRIES, max_ttl_sec=JWT_CACHE_MAX_TTL_SEC)
+
+# Revocación de tokens por jti: copia local sincronizada desde el stream de Valkey que escribe el auth
+REVOCATION_ENABLED = os.getenv("REVOCATION_ENABLED", "true").lower() == "true"
+VALKEY_HOST = os.getenv("VALKEY_HOST", "valkey")
+VALKEY_PORT = int(os.getenv("VALKEY_PORT", "6379"))
+REVOCATION_STREAM = os.getenv("REVOCATION_STREAM", "auth:revoked")
+REVOCATION_BLOCK_MS = int(os.getenv("REVOCATION_BLOCK_MS", "5000"))
+REVOCATION_RETRY_SEC = float(os.getenv("REVOCATION_RETRY_SEC", "2"))
+
+revocations = RevocationList(
+    host=VALKEY_HOST,
+    port=VALKEY_PORT,
+    stream=REVOCATION_STREAM,
+    block_ms=REVOCATION_BLOCK_MS,
+    retry_sec=REVOCATION_RETRY_SEC,
+    timeout_sec=2
+) if REVOCATION_ENABLED else None
+
+# Camino barato para tokens inválidos: chequeo estructural, cache negativo y cupo de fallos por cliente
+JWT_MAX_TOKEN_BYTES = int(os.getenv("JWT_MAX_TOKEN_BYTES", "8192"))
+JWT_NEGATIVE_CACHE_ENABLED = os.getenv("JWT_NEGATIVE_CACHE_ENABLED", "true").lower() == "true"
+JWT_NEGATIVE_CACHE_MAX_ENTRIES = int(os.getenv("JWT_NEGATIVE_CACHE_MAX_ENTRIES", "10000"))
+JWT_NEGATIVE_CACHE_TTL_SEC = float(os.getenv("JWT_NEGATIVE_CACHE_TTL_SEC", "300"))
+AUTH_FAIL_LIMIT_ENABLED = os.getenv("AUTH_FAIL_LIMIT_ENABLED", "true").lower() == "true"
+AUTH_FAIL_RATE_PER_SEC = float(os.getenv("AUTH_FAIL_RATE_PER_SEC", "5"))
+AUTH_FAIL_BURST = float(os.getenv("AUTH_FAIL_BURST", "20"))
+AUTH_FAIL_MAX_CLIENTS = int(os.getenv("AUTH_FAIL_MAX_CLIENTS", "10000"))
+AUTH_FAIL_LOG_EVERY = int(os.getenv("AUTH_FAIL_LOG_EVERY", "100"))   # 1 de cada N rechazos del mismo tipo
+
+rejected_tokens = RejectedTokenCache(max_entries=JWT_NEGATIVE_CACHE_MAX_ENTRIES, ttl_sec=JWT_NEGATIVE_CACHE_TTL_SEC)
+failure_limiter = FailureRateLimiter(
+    rate_per_sec=AUTH_FAIL_RATE_PER_SEC,
+    burst=AUTH_FAIL_BURST,
+    max_clients=AUTH_FAIL_MAX_CLIENTS
+)
+log_sampler = LogSampler(every=AUTH_FAIL_LOG_EVERY)
+
+# Tabla ruta -> política (roles / permisos con wildcard), compilada a bitsets al arrancar
+POLICY_FILE = os.getenv("POLICY_FILE", "")
+
+policies = PolicyEngine.from_file(POLICY_FILE)
+
+route_table = RouteTable.from_file(ROUTES_FILE, upstreams={"api": UPSTREAM_API_BASE}, pool_maxsize=UPSTREAM_POOL_MAXSIZE)
+for _route in route_table.routes:
+    if _route.policy is not None and not policies.has(_route.policy):
+        raise KeyError(f"Route {_route.prefix} uses unknown policy: {_route.policy}")
+
+jwks_cache = None if JWT_SYMMETRIC else JwksCache(
+    url=JWKS_URL,
+    algorithms=[JWT_ALGORITHM],
+    refresh_sec=JWKS_REFRESH_SEC,
+    retry_sec=JWKS_RETRY_SEC,
+    min_refresh_gap_sec=JWKS_MIN_REFRESH_GAP_SEC,
+    timeout_sec=JWKS_TIMEOUT_SEC
+)
+
 
 # -------------------------
 # Helpers JWT
@@ -36,96 +143,260 @@ def extract_bearer_token() -> str | None:
     return token or None
 
 
-def require_jwt(required_role: str | None = None):
-    def decorator(fn):
-        @wraps(fn)
-        def wrapper(*args, **kwargs):
-            token = extract_bearer_token()
-
-            if not token:
-                app.logger.warning("[JWT] missing or invalid Authorization header")
-                return jsonify({
-                    "error": "MISSING_OR_INVALID_AUTH_HEADER",
-                    "message": "Authorization header must use Bearer token"
-                }), 401
-
-            try:
-                payload = jwt.decode(
-                    token,
-                    JWT_SECRET,
-                    algorithms=[JWT_ALGORITHM],
-                    issuer=JWT_ISSUER,
-                    audience=JWT_AUDIENCE
-                )
-                request.jwt_payload = payload
-
-            except jwt.ExpiredSignatureError:
-                app.logger.warning("[JWT] rejected: token expired")
-                return jsonify({
-                    "error": "TOKEN_EXPIRED",
-                    "message": "JWT is expired"
-                }), 401
-
-            except jwt.InvalidAudienceError:
-                app.logger.warning("[JWT] rejected: invalid audience")
-                return jsonify({
-                    "error": "INVALID_AUDIENCE",
-                    "message": "JWT audience is invalid"
-                }), 401
-
-            except jwt.InvalidIssuerError:
-                app.logger.warning("[JWT] rejected: invalid issuer")
-                return jsonify({
-                    "error": "INVALID_ISSUER",
-                    "message": "JWT issuer is invalid"
-                }), 401
-
-            except jwt.InvalidSignatureError:
-                app.logger.warning("[JWT] rejected: invalid signature")
-                return jsonify({
-                    "error": "INVALID_SIGNATURE",
-                    "message": "JWT signature is invalid"
-                }), 401
-
-            except jwt.DecodeError:
-                app.logger.warning("[JWT] rejected: malformed token")
-                return jsonify({
-                    "error": "MALFORMED_TOKEN",
-                    "message": "JWT is malformed"
-                }), 401
-
-            except jwt.InvalidTokenError:
-                app.logger.warning("[JWT] rejected: invalid token")
-                return jsonify({
-                    "error": "INVALID_TOKEN",
-                    "message": "JWT is invalid"
-                }), 401
-
-            token_role = payload.get("role")
-            if required_role and token_role != required_role:
-                app.logger.warning(
-                    f"[JWT] rejected: forbidden role={token_role}, required={required_role}"
-                )
-                return jsonify({
-                    "error": "FORBIDDEN",
-                    "message": "Token does not have the required role",
-                    "required_role": required_role,
-                    "actual_role": token_role
-                }), 403
-
-            app.logger.info(
-                f"[JWT] accepted: sub={payload.get('sub')} role={payload.get('role')}"
-            )
-            return fn(*args, **kwargs)
-
-        return wrapper
-    return decorator
+def verify_token(token: str) -> dict:
+    if JWT_SYMMETRIC:
+        key = JWT_SECRET
+    else:
+        # kid del header (sin verificar) -> llave pública del JWKS cacheado
+        key = jwks_cache.get(jwt.get_unverified_header(token).get("kid")).key
+
+    return jwt.decode(
+        token,
+        key,
+        algorithms=[JWT_ALGORITHM],
+        issuer=JWT_ISSUER,
+        audience=JWT_AUDIENCE
+    )
+
+
+def decode_token(token: str) -> dict:
+    """
+    verify_token con el cache de tokens verificados delante: un token ya aceptado
+    se resuelve con un hash + lookup, sin volver a verificar la firma.
+    Los errores de jwt.decode se propagan igual que antes.
+    """
+    if not JWT_CACHE_ENABLED:
+        return verify_token(token)
+
+    key = token_cache.key(token)
+    payload = token_cache.get(key)
+    if payload is not None:
+        return payload
+
+    payload = verify_token(token)
+    token_cache.put(key, payload)
+    return payload
+
+
+def client_id() -> str:
+    return request.remote_addr or "unknown"
+
+
+def reject(
+    error: str,
+    message: str,
+    status: int,
+    log_message: str,
+    token_key: bytes | None = None,
+    cacheable: bool = True,
+    extra: dict | None = None,
+    auth_failure: bool = False
+):
+    """
+    Camino común de rechazo: log muestreado, cache negativo del token si el
+    rechazo es definitivo y, solo para fallos de firma/formato (`auth_failure`),
+    el cupo de fallos del cliente: con el cupo agotado esos fallos se contestan
+    429. `extra` se suma al body (p.ej. el detalle de la política en un 403).
+    """
+    if token_key is not None and cacheable and JWT_NEGATIVE_CACHE_ENABLED:
+        rejected_tokens.put(token_key, (error, message, status, log_message, extra, auth_failure))
+
+    if auth_failure and AUTH_FAIL_LIMIT_ENABLED:
+        client = client_id()
+        retry_after = failure_limiter.retry_after(client)
+        failure_limiter.record_failure(client)
+        if retry_after is not None:
+            return too_many_failures(retry_after)
+
+    should_log, count = log_sampler.should_log(error)
+    if should_log:
+        suffix = f" (total={count})" if count > 1 else ""
+        app.logger.warning(f"[JWT] {log_message}{suffix}")
+
+    return jsonify({"error": error, "message": message, **(extra or {})}), status
+
+
+def too_many_failures(retry_after: int):
+    should_log, count = log_sampler.should_log("AUTH_RATE_LIMITED")
+    if should_log:
+        app.logger.warning(f"[JWT] rate limited client={client_id()} (total={count})")
+    response = jsonify({
+        "error": "TOO_MANY_AUTH_FAILURES",
+        "message": "Too many invalid tokens from this client"
+    })
+    response.headers["Retry-After"] = str(retry_after)
+    return response, 429
+
+
+def policy_rejection_key(token_key: bytes, policy: str) -> bytes:
+    # Un 403 depende de la política de la ruta: el mismo token puede pasar otra
+    return token_key + b"|" + policy.encode()
+
+
+def authenticate(policy: str | None):
+    """
+    Valida el bearer token del request actual contra `policy`.
+    Devuelve None si pasa (y deja los claims en request.jwt_payload) o la respuesta de rechazo.
+    El cupo de fallos no se mira antes del token: un cliente limitado (p.ej. una
+    IP compartida) sigue pasando con un token que verifica.
+    """
+    token = extract_bearer_token()
+
+    if not token:
+        return reject(
+            "MISSING_OR_INVALID_AUTH_HEADER",
+            "Authorization header must use Bearer token",
+            401,
+            "missing or invalid Authorization header"
+        )
+
+    # Rechazo barato: forma de JWS y largo, sin tocar PyJWT
+    if not looks_like_jwt(token, JWT_MAX_TOKEN_BYTES):
+        return reject("MALFORMED_TOKEN", "JWT is malformed", 401, "rejected: malformed token", auth_failure=True)
+
+    token_key = token_cache.key(token)
+    if JWT_NEGATIVE_CACHE_ENABLED:
+        rejection = rejected_tokens.get(token_key)
+        if rejection is None and policy:
+            rejection = rejected_tokens.get(policy_rejection_key(token_key, policy))
+        if rejection is not None:
+            error, message, status, log_message, extra, auth_failure = rejection
+            return reject(error, message, status, log_message, extra=extra, auth_failure=auth_failure)
+
+    try:
+        payload = decode_token(token)
+        request.jwt_payload = payload
+
+    except jwt.ExpiredSignatureError:
+        return reject("TOKEN_EXPIRED", "JWT is expired", 401, "rejected: token expired", token_key)
+
+    except jwt.InvalidAudienceError:
+        return reject("INVALID_AUDIENCE", "JWT audience is invalid", 401, "rejected: invalid audience", token_key)
+
+    except jwt.InvalidIssuerError:
+        return reject("INVALID_ISSUER", "JWT issuer is invalid", 401, "rejected: invalid issuer", token_key)
+
+    except JwksUnavailableError:
+        app.logger.error("[JWT] rejected: JWKS not available")
+        return jsonify({
+            "error": "JWKS_UNAVAILABLE",
+            "message": "Signing keys are not available yet"
+        }), 503
+
+    except UnknownKeyError:
+        # No se cachea: el kid puede aparecer en el próximo refresh del JWKS
+        return reject(
+            "UNKNOWN_SIGNING_KEY",
+            "JWT kid does not match any published key",
+            401,
+            "rejected: unknown signing key",
+            token_key,
+            cacheable=False
+        )
+
+    except jwt.InvalidSignatureError:
+        return reject(
+            "INVALID_SIGNATURE",
+            "JWT signature is invalid",
+            401,
+            "rejected: invalid signature",
+            token_key,
+            auth_failure=True
+        )
+
+    except jwt.DecodeError:
+        return reject("MALFORMED_TOKEN", "JWT is malformed", 401, "rejected: malformed token", token_key, auth_failure=True)
+
+    except jwt.InvalidTokenError:
+        # No se cachea: p.ej. nbf/iat en el futuro (ImmatureSignatureError) deja de fallar solo
+        return reject("INVALID_TOKEN", "JWT is invalid", 401, "rejected: invalid token", token_key, cacheable=False)
+
+    if revocations is not None and revocations.is_revoked(payload.get("jti")):
+        return reject(
+            "TOKEN_REVOKED",
+            "JWT has been revoked",
+            401,
+            f"rejected: token revoked jti={payload.get('jti')}",
+            token_key
+        )
+
+    token_role = payload.get("role")
+    decision = policies.evaluate(policy, token_role, payload.get("permissions")) if policy else None
+    if decision is not None and not decision.allowed:
+        return reject(
+            "FORBIDDEN",
+            "Token does not satisfy the route policy",
+            403,
+            f"rejected: forbidden policy={policy} role={token_role} "
+            f"missing_permissions={decision.missing_permissions}",
+            policy_rejection_key(token_key, policy),
+            extra={
+                "policy": policy,
+                # Campo del gateway original: el rol cuando la política admite uno solo
+                "required_role": decision.required_roles[0] if len(decision.required_roles) == 1 else None,
+                "required_roles": decision.required_roles,
+                "actual_role": token_role,
+                "missing_permissions": decision.missing_permissions
+            }
+        )
+
+    # %-args: si el record se filtra/muestrea no se formatea
+    app.logger.info("[JWT] accepted: sub=%s role=%s", payload.get("sub"), payload.get("role"))
+    return None
 
 
 # -------------------------
 # Helpers proxy
 # -------------------------
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailers", "transfer-encoding", "upgrade", "host", "content-length"
+}
+
+
+def forward_request_headers() -> dict:
+    headers = {
+        name: value
+        for name, value in request.headers.items()
+        if name.lower() not in HOP_BY_HOP_HEADERS
+    }
+    forwarded_for = request.headers.get("X-Forwarded-For")
+    client = request.remote_addr or ""
+    headers["X-Forwarded-For"] = f"{forwarded_for}, {client}" if forwarded_for else client
+    return headers
+
+
+def request_body():
+    """
+    Bodies chicos (con Content-Length) se reenvían bufferizados; el resto se
+    pasa como stream (chunked) sin cargarlo entero en memoria.
+    """
+    content_length = request.content_length
+    if content_length == 0 or (content_length is None and "chunked" not in request.headers.get("Transfer-Encoding", "")):
+        return None
+    if content_length is not None and content_length <= PROXY_STREAM_THRESHOLD_BYTES:
+        return request.get_data()
+    return request.stream
+
+
+def upstream_content_length(resp: requests.Response) -> int | None:
+    """
+    Content-Length del upstream como int; None si falta o no es un entero
+    válido (se trata como largo desconocido: se streamea).
+    """
+    try:
+        content_length = int(resp.headers["Content-Length"])
+    except (KeyError, ValueError):
+        return None
+    return content_length if content_length >= 0 else None
+
+
 def proxy_response(resp: requests.Response) -> Response:
+    """
+    El upstream se consulta con stream=True: cuerpos con Content-Length
+    <= PROXY_STREAM_THRESHOLD_BYTES se bufferizan, el resto se reenvía en
+    chunks de PROXY_STREAM_CHUNK_SIZE a medida que llegan.
+    """
     content_type = resp.headers.get("Content-Type", "application/json")
     excluded_headers = {"content-encoding", "content-length", "transfer-encoding", "connection"}
 
@@ -135,7 +406,20 @@ def proxy_response(resp: requests.Response) -> Response:
         if name.lower() not in excluded_headers
     ]
 
-    return Response(resp.content, resp.status_code, headers=headers, content_type=content_type)
+    content_length = upstream_content_length(resp)
+    small_body = content_length is not None and content_length <= PROXY_STREAM_THRESHOLD_BYTES
+
+    if not PROXY_STREAMING or small_body:
+        return Response(resp.content, resp.status_code, headers=headers, content_type=content_type)
+
+    proxied = Response(
+        resp.iter_content(chunk_size=PROXY_STREAM_CHUNK_SIZE),
+        resp.status_code,
+        headers=headers,
+        content_type=content_type
+    )
+    proxied.call_on_close(resp.close)
+    return proxied
 
 
 # -------------------------
@@ -146,38 +430,114 @@ def health():
     return "ok", 200
 
 
+@app.get("/logging/state")
+def logging_state():
+    """
+    Cola de logs de ESTE worker: encolados, descartados y muestreados.
+    """
+    if async_logging is None:
+        return jsonify({"async": False, "level": LOG_LEVEL}), 200
+    return jsonify({"async": True, "level": LOG_LEVEL, **async_logging.snapshot()}), 200
+
+
 @app.get("/jwt/config")
 def jwt_config():
     return jsonify({
         "algorithm": JWT_ALGORITHM,
         "issuer": JWT_ISSUER,
         "audience": JWT_AUDIENCE,
-        "upstream_api_base": UPSTREAM_API_BASE
+        "upstream_api_base": UPSTREAM_API_BASE,
+        "jwks": None if JWT_SYMMETRIC else jwks_cache.snapshot()
+    }), 200
+
+
+@app.get("/jwt/revocations/state")
+def jwt_revocations_state():
+    """
+    Estado de la sincronización de jti revocados de ESTE worker.
+    """
+    if revocations is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify({"enabled": True, **revocations.snapshot()}), 200
+
+
+@app.get("/jwt/guard/state")
+def jwt_guard_state():
+    """
+    Rechazos por tipo, cache negativo y clientes limitados de ESTE worker.
+    """
+    return jsonify({
+        "rejections": log_sampler.snapshot(),
+        "negative_cache": {"enabled": JWT_NEGATIVE_CACHE_ENABLED, **rejected_tokens.snapshot()},
+        "failure_limiter": {"enabled": AUTH_FAIL_LIMIT_ENABLED, **failure_limiter.snapshot()}
     }), 200
 
 
-@app.get("/api/items")
-@require_jwt(required_role="admin")
-def get_items():
+@app.get("/jwt/policies")
+def jwt_policies():
+    return jsonify(policies.snapshot()), 200
+
+
+@app.get("/jwt/cache/state")
+def jwt_cache_state():
+    """
+    Hit rate del cache de tokens verificados de ESTE worker.
+    """
+    return jsonify({"enabled": JWT_CACHE_ENABLED, **token_cache.snapshot()}), 200
+
+
+@app.get("/gateway/routes")
+def gateway_routes():
+    return jsonify(route_table.snapshot()), 200
+
+
+@app.route("/<path:path>", methods=["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
+def proxy(path: str):
     """
-    Endpoint protegido en el gateway.
-    Si el JWT es válido y tiene role=admin, reenvía a la API.
+    Reverse proxy según ROUTES: busca la ruta por prefix + método, aplica su
+    política JWT y reenvía método, query string, headers y body al upstream
+    por la Session (conexiones persistentes) de ese upstream.
     """
-    upstream_url = f"{UPSTREAM_API_BASE}/api/v1/items"
+    # request.path ya viene decodificado: se normaliza antes de elegir ruta/política
+    path = normalize_path(request.path)
+    if path is None:
+        return jsonify({"error": "INVALID_PATH", "message": "Path must not contain '..' segments"}), 400
+
+    route, path_known = route_table.match(request.method, path)
+    if route is None:
+        if path_known:
+            return jsonify({"error": "METHOD_NOT_ALLOWED", "message": f"{request.method} not routed"}), 405
+        return jsonify({"error": "NOT_FOUND", "message": "No route for this path"}), 404
+
+    rejection = authenticate(route.policy)
+    if rejection is not None:
+        return rejection
+
+    upstream_url = route.upstream_url(route_table.upstreams[route.upstream], path)
+    headers = forward_request_headers()
 
     try:
-        response = requests.get(upstream_url, timeout=UPSTREAM_TIMEOUT_SEC)
+        response = route_table.sessions[route.upstream].request(
+            request.method,
+            upstream_url,
+            params=request.query_string.decode() or None,
+            data=request_body(),
+            headers=headers,
+            timeout=UPSTREAM_TIMEOUT_SEC,
+            stream=True,
+            allow_redirects=False
+        )
         return proxy_response(response)
 
     except requests.Timeout:
-        app.logger.error("[GATEWAY] upstream timeout")
+        app.logger.error(f"[GATEWAY] upstream timeout route={route.prefix}")
         return jsonify({
             "error": "UPSTREAM_TIMEOUT",
             "message": f"Upstream timeout after {UPSTREAM_TIMEOUT_SEC}s"
         }), 504
 
     except requests.RequestException as e:
-        app.logger.error(f"[GATEWAY] upstream error: {str(e)}")
+        app.logger.error(f"[GATEWAY] upstream error route={route.prefix}: {str(e)}")
         return jsonify({
             "error": "UPSTREAM_ERROR",
             "message": str(e)
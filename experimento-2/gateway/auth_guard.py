@@ -0,0 +1,136 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# header.payload.signature, cada parte base64url sin padding
+_JWT_SHAPE = re.compile(r"[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]*")
+
+
+def looks_like_jwt(token: str, max_bytes: int) -> bool:
+    """
+    Chequeo estructural previo a jwt.decode: largo acotado y forma de JWS compacto.
+    """
+    return len(token) <= max_bytes and _JWT_SHAPE.fullmatch(token) is not None
+
+
+class RejectedTokenCache:
+    """
+    Cache negativo (por worker): hash del token -> datos del rechazo reciente,
+    para contestar igual sin volver a decodificarlo. Solo se guardan rechazos
+    definitivos (firma, exp, malformado, revocado, y 403 por token + política).
+    """
+
+    def __init__(self, max_entries: int, ttl_sec: float):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[bytes, tuple[tuple, float]] = OrderedDict()
+        self.hits = 0
+
+    def get(self, key: bytes) -> tuple | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            rejection, expires_at = entry
+            if now >= expires_at:
+                del self._entries[key]
+                return None
+            self.hits += 1
+            return rejection
+
+    def put(self, key: bytes, rejection: tuple):
+        with self._lock:
+            self._entries[key] = (rejection, time.monotonic() + self.ttl_sec)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits}
+
+
+class FailureRateLimiter:
+    """
+    Token bucket de fallos de autenticación por cliente: cada token con firma
+    o formato inválido consume 1; con el bucket vacío esos fallos se contestan
+    429. Los tokens que verifican pasan igual, así un cliente malo detrás de
+    una IP compartida no deja afuera a los demás. Se recargan rate_per_sec
+    tokens por segundo hasta `burst`. Acotado a max_clients (LRU).
+    """
+
+    def __init__(self, rate_per_sec: float, burst: float, max_clients: int):
+        self.rate_per_sec = rate_per_sec
+        self.burst = burst
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+        self.limited = 0
+
+    def _bucket(self, client: str, now: float) -> list[float]:
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = [self.burst, now]
+            self._buckets[client] = bucket
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            tokens, updated_at = bucket
+            bucket[0] = min(self.burst, tokens + (now - updated_at) * self.rate_per_sec)
+            bucket[1] = now
+        self._buckets.move_to_end(client)
+        return bucket
+
+    def retry_after(self, client: str) -> int | None:
+        """
+        Segundos a esperar si el cliente agotó su cupo de fallos; None si puede seguir.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if client not in self._buckets:
+                return None
+            bucket = self._bucket(client, now)
+            if bucket[0] >= 1.0:
+                return None
+            self.limited += 1
+            return max(1, int((1.0 - bucket[0]) / self.rate_per_sec + 0.999))
+
+    def record_failure(self, client: str):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(client, now)
+            bucket[0] = max(0.0, bucket[0] - 1.0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "rate_per_sec": self.rate_per_sec,
+                "burst": self.burst,
+                "tracked_clients": len(self._buckets),
+                "limited": self.limited
+            }
+
+
+class LogSampler:
+    """
+    Loguea el 1er evento de cada tipo y después 1 de cada `every`,
+    con el conteo acumulado, para que un flood no se convierta en I/O de logs.
+    """
+
+    def __init__(self, every: int):
+        self.every = max(1, every)
+        self._lock = threading.Lock()
+        self._counts: dict[str, int] = {}
+
+    def should_log(self, kind: str) -> tuple[bool, int]:
+        with self._lock:
+            count = self._counts.get(kind, 0) + 1
+            self._counts[kind] = count
+        return (count - 1) % self.every == 0, count
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
@@ -0,0 +1,112 @@
+import threading
+import time
+
+import jwt
+import requests
+
+
+class JwksUnavailableError(Exception):
+    """
+    Todavía no se pudo cargar ningún JWKS (p.ej. auth aún no levantó).
+    """
+
+
+class UnknownKeyError(jwt.InvalidTokenError):
+    """
+    El `kid` del token no está en el JWKS cacheado.
+    """
+
+
+class JwksCache:
+    """
+    Llaves públicas del auth service indexadas por `kid`.
+
+    Un thread daemon refresca el JWKS cada refresh_sec (o cada retry_sec
+    mientras no haya ninguna copia cargada). get() solo lee el dict en
+    memoria: nunca hay llamadas de red en el camino del request. Un kid
+    desconocido adelanta el próximo refresh (como máximo uno cada
+    min_refresh_gap_sec) para recoger llaves recién rotadas.
+    Si un refresh falla se sigue usando la última copia buena.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        algorithms: list[str],
+        refresh_sec: float,
+        retry_sec: float,
+        min_refresh_gap_sec: float,
+        timeout_sec: float,
+    ):
+        self.url = url
+        self.algorithms = algorithms
+        self.refresh_sec = refresh_sec
+        self.retry_sec = retry_sec
+        self.min_refresh_gap_sec = min_refresh_gap_sec
+        self.timeout_sec = timeout_sec
+
+        self._keys: dict[str, jwt.PyJWK] | None = None
+        self._wakeup = threading.Event()
+        self._last_attempt = 0.0
+        self.fetched_at = None
+        self.refreshes = 0
+        self.failures = 0
+        self.unknown_kid = 0
+        self.last_error = None
+
+        threading.Thread(target=self._run, name="jwks-refresh", daemon=True).start()
+
+    def _fetch(self):
+        resp = requests.get(self.url, timeout=self.timeout_sec)
+        resp.raise_for_status()
+
+        keys = {}
+        for jwk in resp.json().get("keys", []):
+            # Solo llaves de firma con alg permitido: evita confusión de algoritmos
+            if jwk.get("kid") and jwk.get("alg") in self.algorithms and jwk.get("use", "sig") == "sig":
+                keys[jwk["kid"]] = jwt.PyJWK(jwk)
+        self._keys = keys
+        self.fetched_at = time.time()
+        self.refreshes += 1
+
+    def _run(self):
+        while True:
+            self._last_attempt = time.monotonic()
+            try:
+                self._fetch()
+                self.last_error = None
+            except (requests.RequestException, ValueError, jwt.PyJWKError) as e:
+                self.failures += 1
+                self.last_error = str(e)
+
+            wait_sec = self.refresh_sec if self._keys is not None else self.retry_sec
+            self._wakeup.wait(wait_sec)
+            self._wakeup.clear()
+
+            gap = time.monotonic() - self._last_attempt
+            if gap < self.min_refresh_gap_sec:
+                time.sleep(self.min_refresh_gap_sec - gap)
+
+    def get(self, kid: str | None) -> jwt.PyJWK:
+        keys = self._keys
+        if keys is None:
+            raise JwksUnavailableError(self.last_error or "JWKS not loaded yet")
+
+        key = keys.get(kid) if kid else None
+        if key is None:
+            self.unknown_kid += 1
+            self._wakeup.set()
+            raise UnknownKeyError(f"Unknown signing key kid={kid}")
+        return key
+
+    def snapshot(self) -> dict:
+        keys = self._keys
+        return {
+            "url": self.url,
+            "kids": sorted(keys) if keys is not None else None,
+            "fetched_at": self.fetched_at,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "unknown_kid": self.unknown_kid,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,123 @@
+import json
+
+# Política por nombre: roles admitidos (cualquiera de ellos, "*" = cualquier rol)
+# y permisos requeridos (todos). El token puede traer permisos con wildcard
+# ("items:*", "*") que cubren a los permisos requeridos con ese prefijo.
+# Las rutas por defecto exigen solo rol, como el gateway original: /auth/token
+# emite sin permisos salvo que se pidan. Exigir permisos es opt-in (POLICY_FILE).
+DEFAULT_POLICIES = {
+    "items:list": {"roles": ["admin"], "permissions": []},
+    "items:read": {"roles": ["*"], "permissions": ["items:read"]},
+    "items:write": {"roles": ["admin", "operator"], "permissions": []},
+    "authenticated": {"roles": ["*"], "permissions": []}
+}
+
+
+class Decision:
+    def __init__(self, allowed: bool, policy: str, required_roles: list[str], missing_permissions: list[str]):
+        self.allowed = allowed
+        self.policy = policy
+        self.required_roles = required_roles
+        self.missing_permissions = missing_permissions
+
+
+class _CompiledPolicy:
+    def __init__(self, name: str, roles_mask: int, permissions_mask: int, any_role: bool):
+        self.name = name
+        self.roles_mask = roles_mask
+        self.permissions_mask = permissions_mask
+        self.any_role = any_role
+
+
+class PolicyEngine:
+    """
+    Compila la tabla de políticas al arrancar:
+      - cada rol y cada permiso requerido recibe un bit
+      - cada política queda como (máscara de roles, máscara de permisos)
+      - cada prefijo de permiso ("items:") tiene precalculada la máscara que
+        cubre su wildcard ("items:*")
+    Evaluar un request = traducir rol/permisos del token a máscaras (lookups
+    en dicts) y hacer dos AND; el costo no crece con la cantidad de rutas.
+    """
+
+    def __init__(self, policies: dict):
+        roles = sorted({role for p in policies.values() for role in p.get("roles", []) if role != "*"})
+        permissions = sorted({perm for p in policies.values() for perm in p.get("permissions", [])})
+
+        self._role_bits = {role: 1 << i for i, role in enumerate(roles)}
+        self._permission_bits = {perm: 1 << i for i, perm in enumerate(permissions)}
+        self._all_permissions = (1 << len(permissions)) - 1
+
+        self._prefix_masks: dict[str, int] = {}
+        for perm, bit in self._permission_bits.items():
+            for i, char in enumerate(perm):
+                if char == ":":
+                    prefix = perm[:i + 1]
+                    self._prefix_masks[prefix] = self._prefix_masks.get(prefix, 0) | bit
+
+        self._policies = {
+            name: _CompiledPolicy(
+                name=name,
+                roles_mask=self._mask(self._role_bits, p.get("roles", [])),
+                permissions_mask=self._mask(self._permission_bits, p.get("permissions", [])),
+                any_role="*" in p.get("roles", [])
+            )
+            for name, p in policies.items()
+        }
+        self._source = policies
+
+    @staticmethod
+    def _mask(bits: dict[str, int], names: list[str]) -> int:
+        mask = 0
+        for name in names:
+            mask |= bits.get(name, 0)
+        return mask
+
+    @classmethod
+    def from_file(cls, path: str | None) -> "PolicyEngine":
+        if not path:
+            return cls(DEFAULT_POLICIES)
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def has(self, name: str) -> bool:
+        return name in self._policies
+
+    def permissions_mask(self, granted: list[str]) -> int:
+        mask = 0
+        for perm in granted:
+            if not isinstance(perm, str):
+                continue
+            if perm == "*":
+                return self._all_permissions
+            if perm.endswith(":*"):
+                mask |= self._prefix_masks.get(perm[:-1], 0)
+            else:
+                mask |= self._permission_bits.get(perm, 0)
+        return mask
+
+    def evaluate(self, name: str, role: str | None, granted: list[str]) -> Decision:
+        policy = self._policies[name]
+        # Los claims vienen firmados pero con valores arbitrarios (body de /auth/token):
+        # un rol que no es str cuenta como sin rol, y permissions que no es lista como sin permisos
+        if not isinstance(role, str):
+            role = None
+        if not isinstance(granted, list):
+            granted = []
+
+        role_ok = policy.any_role or bool(self._role_bits.get(role, 0) & policy.roles_mask)
+        missing_mask = policy.permissions_mask & ~self.permissions_mask(granted)
+
+        if role_ok and not missing_mask:
+            return Decision(True, name, [], [])
+
+        # Solo en el camino de rechazo se traducen los bits a nombres
+        missing = [perm for perm, bit in self._permission_bits.items() if bit & missing_mask]
+        return Decision(False, name, self._source[name].get("roles", []), missing)
+
+    def snapshot(self) -> dict:
+        return {
+            "roles": list(self._role_bits),
+            "permissions": list(self._permission_bits),
+            "policies": self._source
+        }
@@ -0,0 +1,104 @@
+import logging
+import threading
+import time
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationList:
+    """
+    Copia en memoria (por worker) de los `jti` revocados, sincronizada desde el
+    stream de Valkey donde escribe el auth service.
+
+    El stream sirve a la vez de push y de delta: un thread daemon hace
+    XREAD BLOCK desde el último id leído, así que una revocación llega en
+    cuanto se publica y, tras una desconexión, se retoma desde ese id sin
+    volver a descargar todo. is_revoked() es un lookup en un dict: ninguna
+    llamada de red por request.
+
+    Si Valkey no responde se sigue usando la última copia (fail-open) y se
+    reintenta cada retry_sec. Los jti se olvidan al pasar su exp: un token
+    expirado ya lo rechaza jwt.decode. Una entrada mal formada se saltea
+    (se cuenta en `skipped`): nada de lo que venga del stream debe matar el
+    thread, porque sin él las revocaciones dejan de aplicarse en el worker.
+    """
+
+    def __init__(self, host: str, port: int, stream: str, block_ms: int, retry_sec: float, timeout_sec: float):
+        self.stream = stream
+        self.block_ms = block_ms
+        self.retry_sec = retry_sec
+
+        self._client = redis.Redis(
+            host=host,
+            port=port,
+            socket_timeout=timeout_sec + block_ms / 1000,
+            socket_connect_timeout=timeout_sec
+        )
+        self._revoked: dict[str, float] = {}
+        self._last_id = "0"
+        self._lock = threading.Lock()
+        self.synced = False
+        self.events = 0
+        self.errors = 0
+        self.skipped = 0
+        self.last_error = None
+
+        threading.Thread(target=self._run, name="revocation-sync", daemon=True).start()
+
+    def _prune(self, now: float):
+        with self._lock:
+            expired = [jti for jti, exp in self._revoked.items() if exp <= now]
+            for jti in expired:
+                del self._revoked[jti]
+
+    def _apply(self, entries: list):
+        with self._lock:
+            for entry_id, fields in entries:
+                # El id avanza igual: una entrada inválida no se vuelve a leer
+                self._last_id = entry_id
+                try:
+                    jti, exp = fields[b"jti"].decode(), float(fields[b"exp"])
+                except (KeyError, ValueError, UnicodeDecodeError) as e:
+                    self.skipped += 1
+                    logger.warning(f"[REVOCATION] skipped malformed entry id={entry_id!r}: {e!r}")
+                    continue
+                self._revoked[jti] = exp
+                self.events += 1
+
+    def _run(self):
+        while True:
+            try:
+                response = self._client.xread({self.stream: self._last_id}, block=self.block_ms, count=1000)
+                self.synced = True
+                self.last_error = None
+                for _, entries in response:
+                    self._apply(entries)
+                self._prune(time.time())
+            except Exception as e:
+                # Redis caído o cualquier error inesperado: se reintenta, el thread no muere
+                self.errors += 1
+                self.last_error = str(e)
+                if not isinstance(e, redis.RedisError):
+                    logger.exception("[REVOCATION] sync error")
+                time.sleep(self.retry_sec)
+
+    def is_revoked(self, jti: str | None) -> bool:
+        if jti is None:
+            return False
+        exp = self._revoked.get(jti)
+        return exp is not None and exp > time.time()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "stream": self.stream,
+                "synced": self.synced,
+                "revoked": len(self._revoked),
+                "events": self.events,
+                "errors": self.errors,
+                "skipped": self.skipped,
+                "last_id": self._last_id.decode() if isinstance(self._last_id, bytes) else self._last_id,
+                "last_error": self.last_error
+            }
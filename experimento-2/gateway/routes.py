@@ -0,0 +1,123 @@
+import json
+import posixpath
+from urllib.parse import quote, unquote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# prefix del gateway -> upstream (nombre en `upstreams`) + path base en el upstream.
+# policy=None deja la ruta pública; methods=["*"] acepta cualquier método.
+DEFAULT_ROUTES = [
+    {"prefix": "/api/items", "upstream": "api", "upstream_path": "/api/v1/items", "methods": ["GET"], "policy": "items:list"},
+    {"prefix": "/api/items", "upstream": "api", "upstream_path": "/api/v1/items", "methods": ["POST", "PUT", "PATCH", "DELETE"], "policy": "items:write"}
+]
+
+
+# Caracteres que se reenvían tal cual al re-codificar el path normalizado
+PATH_SAFE_CHARS = "/:@!$&'()*+,;=-._~"
+
+
+def normalize_path(path: str) -> str | None:
+    """
+    Path decodificado y sin segmentos `.`/`//`, o None si trae `..`: el match de
+    rutas y la URL del upstream usan solo este path, así un `%2e%2e` no puede
+    salirse del prefix de la ruta (y de su política) en el upstream.
+    """
+    decoded = unquote(path)
+    if ".." in decoded.split("/") or "\0" in decoded:
+        return None
+    # normpath deja "//" inicial (POSIX): se colapsa a una sola barra
+    return "/" + posixpath.normpath("/" + decoded).lstrip("/")
+
+
+class Route:
+    def __init__(self, prefix: str, upstream: str, upstream_path: str, methods: list[str], policy: str | None):
+        self.prefix = prefix.rstrip("/") or "/"
+        self.upstream = upstream
+        self.upstream_path = upstream_path.rstrip("/")
+        self.methods = {method.upper() for method in methods}
+        self.policy = policy
+
+    def matches_path(self, path: str) -> bool:
+        # Solo en límite de segmento: /api/items matchea /api/items/3 pero no /api/itemsx
+        return path == self.prefix or path.startswith(self.prefix + "/") or self.prefix == "/"
+
+    def allows(self, method: str) -> bool:
+        return "*" in self.methods or method in self.methods
+
+    def upstream_url(self, base: str, path: str) -> str:
+        """`path` es el ya normalizado (normalize_path) y debe estar bajo el prefix."""
+        if not self.matches_path(path):
+            raise ValueError(f"Path {path!r} is outside route prefix {self.prefix!r}")
+        suffix = path[len(self.prefix):] if self.prefix != "/" else path
+        return f"{base}{self.upstream_path}{quote(suffix, safe=PATH_SAFE_CHARS)}"
+
+
+class RouteTable:
+    """
+    Tabla de ruteo compilada al arrancar: rutas ordenadas por largo de prefix
+    (gana el más específico) y una Session con pool de conexiones
+    persistentes por upstream.
+    """
+
+    def __init__(self, routes: list[dict], upstreams: dict[str, str], pool_maxsize: int):
+        self.routes = sorted(
+            (Route(
+                prefix=r["prefix"],
+                upstream=r["upstream"],
+                upstream_path=r.get("upstream_path", r["prefix"]),
+                methods=r.get("methods", ["GET"]),
+                policy=r.get("policy")
+            ) for r in routes),
+            key=lambda route: len(route.prefix),
+            reverse=True
+        )
+        missing = {route.upstream for route in self.routes} - set(upstreams)
+        if missing:
+            raise KeyError(f"Routes reference unknown upstreams: {sorted(missing)}")
+
+        self.upstreams = {name: base.rstrip("/") for name, base in upstreams.items()}
+        self.sessions = {}
+        for name in self.upstreams:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self.sessions[name] = session
+
+    @classmethod
+    def from_file(cls, path: str | None, upstreams: dict[str, str], pool_maxsize: int) -> "RouteTable":
+        """
+        ROUTES_FILE: {"upstreams": {...}, "routes": [...]}; los upstreams del
+        archivo se suman/pisan a los del entorno.
+        """
+        if not path:
+            return cls(DEFAULT_ROUTES, upstreams, pool_maxsize)
+        with open(path) as f:
+            table = json.load(f)
+        return cls(table["routes"], {**upstreams, **table.get("upstreams", {})}, pool_maxsize)
+
+    def match(self, method: str, path: str) -> tuple[Route | None, bool]:
+        """
+        (ruta, path_conocido): path_conocido=True sin ruta significa 405.
+        """
+        path_known = False
+        for route in self.routes:
+            if route.matches_path(path):
+                path_known = True
+                if route.allows(method):
+                    return route, True
+        return None, path_known
+
+    def snapshot(self) -> list[dict]:
+        return [
+            {
+                "prefix": route.prefix,
+                "upstream": route.upstream,
+                "upstream_base": self.upstreams[route.upstream],
+                "upstream_path": route.upstream_path,
+                "methods": sorted(route.methods),
+                "policy": route.policy
+            }
+            for route in self.routes
+        ]
@@ -0,0 +1,70 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class VerifiedTokenCache:
+    """
+    Cache LRU (por worker) de claims ya verificados, indexado por sha256 del token
+    (nunca se guarda el token en claro).
+
+    Una entrada vence en min(exp del token, ahora + max_ttl_sec): un token
+    cacheado nunca sobrevive a su propio exp. Solo se cachean tokens que
+    pasaron jwt.decode; los rechazados siempre se vuelven a decodificar.
+    """
+
+    def __init__(self, max_entries: int, max_ttl_sec: float):
+        self.max_entries = max_entries
+        self.max_ttl_sec = max_ttl_sec
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[bytes, tuple[dict, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, key: bytes) -> dict | None:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            payload, expires_at = entry
+            if now >= expires_at:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key: bytes, payload: dict):
+        expires_at = time.time() + self.max_ttl_sec
+        if "exp" in payload:
+            expires_at = min(expires_at, float(payload["exp"]))
+
+        with self._lock:
+            self._entries[key] = (payload, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "max_ttl_sec": self.max_ttl_sec,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None
+            }